@@ -0,0 +1,79 @@
+import time
+import argparse
+import emoji
+import numpy as np
+import pandas as pd
+from collections import defaultdict
+from src.EmojiCounter import EmojiCounter
+from benchmarks.synthetic_chat import random_timestamps
+
+# Emoji counting of the emoji chart, on synthetic messages (digits everywhere, emojis in one message in three):
+#   per-character loop   the loop create_emoji_chart used to run (it splits the sequences into code points)
+#   EmojiCounter.count   whole emojis, per user and per month
+# Then checks the whole-emoji counts on hand-written messages (skin tones, ZWJ families, flags, keycaps...).
+# Usage, from the repository root: python -m benchmarks.emoji_count [--messages 300000]
+def main():
+    parser = argparse.ArgumentParser(description="Emoji counting benchmark")
+    parser.add_argument("--messages", type=int, default=300_000, help="Synthetic messages")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    words = np.array('ciao come stai 12 alle 21:30 ok partita cena 3-1'.split())
+    emojis = np.array(['😂', '❤️', '👍🏽', '🇮🇹', '👨‍👩‍👧', '🙏', '😂😂😂', '1️⃣'])
+    inserted = [rng.choice(emojis) if i % 3 == 0 else '' for i in range(args.messages)]
+    messages = [' '.join(rng.choice(words, 6)) + (' ' + e if e else '') for e in inserted]
+    df = pd.DataFrame({
+        'date': random_timestamps(args.messages),
+        'user': pd.Categorical.from_codes(rng.integers(0, 10, args.messages), [f'user{i}' for i in range(10)]),
+        'message': pd.array(messages, dtype='string[pyarrow]'),
+    })
+
+    start = time.perf_counter()
+    emoji_freq = defaultdict(int)
+    for message in df['message']:
+        for char in message:
+            if char in emoji.EMOJI_DATA:
+                emoji_freq[char] += 1
+    loop = time.perf_counter() - start
+    print(f"per-character loop  {loop:6.2f}s  {args.messages / loop:>10,.0f} msg/s")
+
+    start = time.perf_counter()
+    counter = EmojiCounter()
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    counts = counter.count(df)
+    elapsed = time.perf_counter() - start
+    print(f"EmojiCounter.count  {elapsed:6.2f}s  {args.messages / elapsed:>10,.0f} msg/s  (+{build:.2f}s to build the regex)")
+
+    # As many whole emojis as inserted
+    expected = defaultdict(int)
+    for e in inserted:
+        if e == '😂😂😂':
+            expected['😂'] += 3
+        elif e:
+            expected[e] += 1
+    assert counts.groupby('emoji')['count'].sum().to_dict() == dict(expected), "wrong emoji counts on the synthetic messages"
+
+    # Whole emojis, not their code points
+    cases = {
+        'ok 👍🏽': {'👍🏽': 1},
+        '👨‍👩‍👧 e 👨‍👩‍👧': {'👨‍👩‍👧': 2},
+        'forza 🇮🇹🇮🇹': {'🇮🇹': 2},
+        '1️⃣ e ©': {'1️⃣': 1, '©️': 1},
+        'riga\n❤ e ❤️': {'❤️': 2},
+        '': {},
+    }
+    df_cases = pd.DataFrame({
+        'date': random_timestamps(len(cases)),
+        'user': pd.Categorical([f'case{i}' for i in range(len(cases))]),  # One user per message
+        'message': pd.array(list(cases), dtype='string[pyarrow]'),
+    })
+    found = counter.count(df_cases)
+    for i, (message, expected_case) in enumerate(cases.items()):
+        rows = found[found['user'] == f'case{i}']
+        assert rows.set_index('emoji')['count'].to_dict() == expected_case, f"{message!r}: {rows.to_dict('records')}"
+    print("✅ Whole emojis counted (skin tones, families, flags, keycaps, variation selectors)")
+
+
+if __name__ == '__main__':
+    main()
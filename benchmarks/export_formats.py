@@ -0,0 +1,64 @@
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+from unittest import mock
+from src.DataProcessing import DataProcessing
+from src.MessageFilter import MessageFilter
+from benchmarks.synthetic_chat import export_lines
+
+# Every layout of DataProcessing.EXPORT_FORMATS, on a synthetic export of each:
+#   - sniff_format recognizes the layout
+#   - the header regex reads every message, the timestamps of the fast path of parse_timestamps are the ones
+#     of pd.to_datetime with the date_format of the layout (and the fast path never falls back to pandas)
+#   - full parse + clean throughput, in messages per second
+# Usage, from the repository root: python -m benchmarks.export_formats [--messages 300000]
+def main():
+    parser = argparse.ArgumentParser(description="Export format checks and ingest throughput")
+    parser.add_argument("--messages", type=int, default=300_000, help="Messages of each synthetic export")
+    args = parser.parse_args()
+
+    message_filter = MessageFilter([], [])
+    with tempfile.TemporaryDirectory() as directory:
+        for name, export_format in DataProcessing.EXPORT_FORMATS.items():
+            lines, expected = export_lines(name, args.messages)
+            raw_path = os.path.join(directory, f"{name}.txt")
+            with open(raw_path, 'w', encoding='utf-8') as fp:
+                fp.writelines(lines)
+
+            assert DataProcessing.sniff_format(raw_path) is export_format, f"{name}: wrong format sniffed"
+
+            matches = [export_format.header.match(line) for line in lines]
+            parts = [(m['date'], m['time'], m['ampm']) for m in matches if m]
+            assert len(parts) == args.messages, f"{name}: {len(parts)} headers matched, {args.messages} expected"
+            dates, times, ampms = (list(column) for column in zip(*parts))
+
+            stamps = pd.Series(dates) + ' ' + pd.Series(times)
+            if '%p' in export_format.date_format:
+                stamps = stamps + ' ' + pd.Series(ampms).str.upper()
+            start = time.perf_counter()
+            reference = pd.to_datetime(stamps, format=export_format.date_format).to_numpy().astype('datetime64[s]')
+            pandas_elapsed = time.perf_counter() - start
+
+            with mock.patch.object(pd, 'to_datetime', side_effect=AssertionError(f"{name}: the fast path fell back to pd.to_datetime")):
+                start = time.perf_counter()
+                fast = DataProcessing.parse_timestamps(dates, times, ampms, export_format.date_format)
+                fast_elapsed = time.perf_counter() - start
+            assert np.array_equal(fast, reference), f"{name}: the fast path differs from pd.to_datetime"
+            assert np.array_equal(fast, expected), f"{name}: wrong timestamps"
+
+            start = time.perf_counter()
+            with open(raw_path, encoding='utf-8') as fp:
+                df = DataProcessing.parse_and_clean(fp, 'Group', message_filter, export_format)
+            elapsed = time.perf_counter() - start
+            assert len(df) == args.messages and np.array_equal(df['date'].to_numpy(), expected), f"{name}: wrong messages"
+
+            print(f"{name:<12} parse + clean {args.messages / elapsed:>10,.0f} msg/s   "
+                  f"timestamps: fast path {args.messages / fast_elapsed:>12,.0f} msg/s, pd.to_datetime {args.messages / pandas_elapsed:>10,.0f} msg/s")
+    print("✅ Every format is sniffed and parsed, the fast path matches pd.to_datetime")
+
+
+if __name__ == '__main__':
+    main()
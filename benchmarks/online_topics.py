@@ -0,0 +1,55 @@
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+from src.TopicModeling import TopicModeling
+from benchmarks.synthetic_chat import random_timestamps, WORDS
+
+# Two updates of the online topic model (topic_modeling.online) on a synthetic chat:
+#   - in one run: the messages are split into several partial_fit batches (online_batch_size)
+#   - across runs: a new TopicModeling loads the saved model (model.pkl) and updates it with the messages added since
+# Every update must go through (IncrementalPCA returns float64 after its first batch, MiniBatchKMeans keeps the
+# dtype of its first one), and the messages already modeled keep their topics.
+# Needs the embedding model (downloaded on the first run).
+# Usage, from the repository root: python -m benchmarks.online_topics [--messages 4000]
+def main():
+    parser = argparse.ArgumentParser(description="Online topic model updates check")
+    parser.add_argument("--messages", type=int, default=4_000, help="Messages of the synthetic chat (half in each run)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Messages per partial_fit batch")
+    parser.add_argument("--topics", type=int, default=10, help="Topics of the online model")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'date': random_timestamps(args.messages),
+        'message': [' '.join(words) for words in rng.choice(WORDS, (args.messages, 6))],
+    })
+    first = args.messages // 2
+
+    with tempfile.TemporaryDirectory() as directory:
+        def new_analyzer():
+            return TopicModeling(
+                'italian', [], None, os.path.join(directory, 'outputs') + os.sep,
+                online_path=os.path.join(directory, 'online'),
+                online_topics=args.topics,
+                online_batch_size=args.batch_size,
+            )
+
+        start = time.perf_counter()
+        topics = new_analyzer().partial_fit(df.iloc[:first])
+        print(f"first run   {time.perf_counter() - start:6.1f}s  {first} messages in {first // args.batch_size} batches")
+        assert len(topics) == first, f"{len(topics)} topics for {first} messages"
+
+        start = time.perf_counter()
+        updated = new_analyzer().partial_fit(df)
+        print(f"second run  {time.perf_counter() - start:6.1f}s  {args.messages - first} new messages on the saved model")
+        assert len(updated) == args.messages, f"{len(updated)} topics for {args.messages} messages"
+        assert updated[:first] == topics, "the messages of the first run changed topic"
+        assert set(updated) <= set(range(args.topics)), f"unexpected topics: {sorted(set(updated))}"
+    print("✅ Several updates in one run and an update of the saved model, same topics for the modeled messages")
+
+
+if __name__ == '__main__':
+    main()
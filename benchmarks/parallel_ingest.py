@@ -0,0 +1,49 @@
+import os
+import time
+import argparse
+import tempfile
+import pandas as pd
+from src.DataProcessing import DataProcessing
+from src.MessageFilter import MessageFilter
+from benchmarks.synthetic_chat import export_lines
+
+# Scaling of the parallel ingest (processing.workers) with the number of processes, on a synthetic iOS export:
+# wall-clock time of a full parse + clean, serial and with DataProcessing.parse_parallel. Every run must give
+# the same cleaned chat and the same filter counts as the serial one.
+# Usage, from the repository root: python -m benchmarks.parallel_ingest [--messages 2000000] [--workers 1 2 4 8]
+def main():
+    parser = argparse.ArgumentParser(description="Parallel ingest scaling benchmark")
+    parser.add_argument("--messages", type=int, default=2_000_000, help="Messages of the synthetic export")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Process counts to time")
+    args = parser.parse_args()
+
+    print(f"🖥️ {os.cpu_count()} CPU cores")
+    with tempfile.TemporaryDirectory() as directory:
+        raw_path = os.path.join(directory, "_chat.txt")
+        lines, _ = export_lines('ios', args.messages, dropped_every=3)
+        with open(raw_path, 'w', encoding='utf-8') as fp:
+            fp.writelines(lines)
+        del lines
+        export_format = DataProcessing.EXPORT_FORMATS['ios']
+
+        message_filter = MessageFilter.from_config(None)
+        start = time.perf_counter()
+        with open(raw_path, encoding='utf-8') as fp:
+            reference = DataProcessing.parse_and_clean(fp, 'Group', message_filter, export_format)
+        serial = time.perf_counter() - start
+        reference_hits = dict(message_filter.hits)
+        print(f"serial       {serial:7.2f}s  {args.messages / serial:>10,.0f} msg/s  ({len(reference)} messages kept)")
+
+        for workers in args.workers:
+            message_filter = MessageFilter.from_config(None)
+            start = time.perf_counter()
+            df, _, _ = DataProcessing.parse_parallel(raw_path, 'Group', message_filter, export_format, 50_000, workers)
+            elapsed = time.perf_counter() - start
+            pd.testing.assert_frame_equal(df, reference)
+            assert message_filter.hits == reference_hits, f"workers={workers}: different filter counts"
+            print(f"workers={workers:<4} {elapsed:7.2f}s  {args.messages / elapsed:>10,.0f} msg/s  (x{serial / elapsed:.2f})")
+    print("✅ Same cleaned chat and filter counts with every number of workers")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+# Synthetic chat data for the benchmarks: nothing here is read by the pipeline
+
+
+# n random message timestamps (one second resolution) between 2015 and 2025, in chronological order
+def random_timestamps(n: int, seed: int = 0) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2015-01-01T00:00:00')
+    seconds = np.sort(rng.integers(0, 10 * 365 * 86_400, n))
+    return pd.Series(start + seconds.astype('timedelta64[s]'))
+
+
+USERS = ['Raffo🍪', 'PippoFranco', 'Anna', 'Luca M.', 'Giulia']
+WORDS = 'ciao come stai oggi domani partita calcio cena pizza lavoro casa mare sole 😂 ❤️ 👍🏽'.split()
+
+
+# Header of a message in each layout of DataProcessing.EXPORT_FORMATS (12-hour clocks: AM/PM after a
+# narrow no-break space on iOS, lowercase am/pm after a space on Android, unpadded hours on both)
+def header(format_name: str, stamp: pd.Timestamp) -> str:
+    hour_12 = f"{(stamp.hour + 11) % 12 + 1}:{stamp:%M}"
+    if format_name == 'ios':
+        return f"[{stamp:%d/%m/%y, %H:%M:%S}]"
+    if format_name == 'ios_12h':
+        return f"[{stamp:%d/%m/%y}, {hour_12}:{stamp:%S}\u202f{stamp:%p}]"
+    if format_name == 'android':
+        return f"{stamp:%d/%m/%Y, %H:%M} -"
+    if format_name == 'android_12h':
+        return f"{stamp:%d/%m/%Y}, {hour_12} {stamp:%p}".lower() + " -"
+    raise ValueError(f"Unknown export format: {format_name}")
+
+
+# Lines of a synthetic export of n messages, and the timestamp of every message (at the resolution of the layout)
+# One message in ten spans two lines, one in fifty starts with the invisible LRM mark (U+200E)
+# dropped_every: every k-th message is a media notice removed by the default filters (0 = none)
+def export_lines(format_name: str, n: int, seed: int = 0, dropped_every: int = 0):
+    rng = np.random.default_rng(seed)
+    stamps = random_timestamps(n, seed)
+    if format_name.startswith('android'):
+        stamps = stamps.dt.floor('min')  # No seconds in Android exports
+    users = rng.choice(USERS, n)
+    words = rng.choice(WORDS, (n, 6))
+    lines = []
+    for i, stamp in enumerate(stamps):
+        prefix = '\u200e' if i % 50 == 0 else ''
+        text = 'image omitted' if dropped_every and i % dropped_every == 0 else ' '.join(words[i])
+        lines.append(f"{prefix}{header(format_name, stamp)} {users[i]}: {text}\n")
+        if i % 10 == 0:
+            lines.append("second line of the message\n")
+    return lines, stamps.to_numpy().astype('datetime64[s]')
@@ -0,0 +1,45 @@
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from src.DataProcessing import DataProcessing
+from benchmarks.synthetic_chat import random_timestamps
+
+# Timestamp parsing of the ingest, in messages per second:
+#   per-row      one pd.to_datetime call per message (the loop clean_batch used to run)
+#   vectorized   one pd.to_datetime call with the explicit format on the whole batch (the fallback)
+#   fast path    DataProcessing.parse_timestamps (integer arithmetic on the raw bytes)
+# The three must give the same timestamps.
+# Usage, from the repository root: python -m benchmarks.timestamps [--messages 200000]
+def main():
+    parser = argparse.ArgumentParser(description="Timestamp parsing benchmark")
+    parser.add_argument("--messages", type=int, default=200_000, help="Messages parsed by the vectorized paths")
+    parser.add_argument("--per-row-messages", type=int, default=20_000, help="Messages parsed one by one (the slow baseline)")
+    args = parser.parse_args()
+
+    stamps = random_timestamps(args.messages)
+    dates = stamps.dt.strftime('%d/%m/%y').tolist()
+    times = stamps.dt.strftime('%H:%M:%S').tolist()
+    expected = stamps.to_numpy().astype('datetime64[s]')
+
+    def measure(name, n, parse):
+        start = time.perf_counter()
+        parsed = parse()
+        elapsed = time.perf_counter() - start
+        assert np.array_equal(np.asarray(parsed, dtype='datetime64[s]'), expected[:n]), f"{name}: wrong timestamps"
+        print(f"{name:<12} {n:>9} messages  {elapsed:7.2f}s  {n / elapsed:>12,.0f} msg/s")
+
+    n = min(args.per_row_messages, args.messages)
+    measure("per-row", n, lambda: [
+        pd.to_datetime(date + ' ' + time_, format='%d/%m/%y %H:%M:%S')
+        for date, time_ in zip(dates[:n], times[:n])
+    ])
+    measure("vectorized", args.messages, lambda: pd.to_datetime(
+        pd.Series(dates) + ' ' + pd.Series(times), format='%d/%m/%y %H:%M:%S'
+    ).to_numpy())
+    measure("fast path", args.messages, lambda: DataProcessing.parse_timestamps(dates, times, [''] * len(dates)))
+    print("✅ All the paths give the same timestamps")
+
+
+if __name__ == '__main__':
+    main()
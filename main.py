@@ -1,19 +1,72 @@
 import yaml
+import argparse
 import multiprocessing
-import seaborn as sns
-sns.set()
-from src.BasicGraphs import BasicGraph
-from src.TopicModeling import TopicModeling
-from src.DataProcessing import DataProcessing
-from src.BasicGraphs import BasicGraph
-from src.SpacyNLP import SpacyNLP
-import pandas as pd
 import os
-from src.RecapPageGenerator import RecapPageGenerator
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.DataProcessing import DataProcessing
+# The heavy modules (spaCy, torch/BERTopic, plotly, wordcloud) are imported inside the stages that use them:
+# e.g. "python main.py --stages basic" never loads torch.
+
+STAGES = ['basic', 'topics', 'recap']
+
+
+# Run independent tasks (functions without arguments) in a pool of threads, or one after another with workers=1.
+# Threads, not processes: the tasks share the chat DataFrame and the fitted models without copying them,
+# and the heavy parts (torch, numpy, image encoding, file writes) release the GIL.
+def run_tasks(tasks, workers):
+    if workers <= 1 or len(tasks) <= 1:
+        return [task() for task in tasks]
+    with ThreadPoolExecutor(min(workers, len(tasks))) as pool:
+        return list(pool.map(lambda task: task(), tasks))
 
 
+# The task, recording its wall-clock time in timings[name]
+def timed(timings, name, task):
+    def run():
+        start = time.perf_counter()
+        task()
+        timings[name] = time.perf_counter() - start
+    return run
+
+
+# Save topic_info.csv and every topic visualization (figure_workers: threads writing the figures)
+def save_topic_outputs(topic_analyzer, outputs_path_TM, n_topics_vis_pie, figure_workers=1):
+    # get df of topic
+    df_topic = topic_analyzer.get_csv()
+    if outputs_path_TM:
+        os.makedirs(outputs_path_TM, exist_ok=True)
+        df_topic.to_csv(outputs_path_TM + "topic_info.csv", index=False)
+
+
+    # Salva visualizzazioni
+    custom_colors = ['#0088FE', '#00C49F', '#FFBB28', '#FF8042', '#8884d8']
+    run_tasks([
+        topic_analyzer.save_vis_hierarchy,
+        topic_analyzer.save_vis_map,
+        topic_analyzer.save_vis_barchart,
+        topic_analyzer.save_vis_topics_over_time,
+        lambda: topic_analyzer.save_vis_pie(
+            n_topics_vis_pie,
+            exclude_topics=[-1],
+            max_title_length=40,
+            n_examples=3,
+            color_sequence=custom_colors
+        ),
+    ], figure_workers)
+
 
 def main():
+    parser = argparse.ArgumentParser(description="WhatsApp chat analysis")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES,
+                        help="Stages to run: basic (charts), topics (topic modeling), recap (HTML page). Default: all")
+    parser.add_argument("--replot-topics", action="store_true",
+                        help="Rebuild the topic visualizations and topic_info.csv from the saved topic model, without retraining")
+    parser.add_argument("--sweep-hdbscan", action="store_true",
+                        help="Try the HDBSCAN settings of topic_modeling.hdbscan_sweep on the (cached) UMAP reduction and exit")
+    args = parser.parse_args()
+
     # Config
     with open("config.yaml", "r") as config_file:
         config = yaml.safe_load(config_file)
@@ -23,97 +76,193 @@ def main():
     processed_path = config["paths"]["processed"]   # Path to the processed dataset
     outputs_path = config["paths"]["outputs"]       # Path to save outputs
     language = config["language"]                   # Chat language
+    batch_size = config["processing"]["batch_size"]   # Messages parsed per batch
+    incremental = config["processing"]["incremental"] # Parse only the new messages of a re-exported chat
+    filters = config.get("filters", {})             # Rules to drop system messages and strip notices (missing = defaults)
+    workers = config["processing"]["workers"]       # Processes used to parse the chat
     outputs_path_TM = config["paths"]["outputsTM"]  # Path to save outputs (Topic Modeling)
+    topic_model_path = config["paths"]["topic_model"]  # Path to save the fitted topic model
     api_key_openai = config['api_key_openai']       # Your API key (OpenAI) if you want use the chatGPT's representation model
     n_top_users = config['parameters_for_graphs']['n_top_users']  # Number of top users displayed in the chart
     n_top_emoji = config['parameters_for_graphs']['n_top_emoji']  # Number of top emojis displayed in the chart
     n_topics_vis_pie = config['parameters_for_graphs']['n_topics_vis_pie']  # Number of topics displayed in the pie chart
+    embedding_cache = config['topic_modeling']['embedding_cache']  # Directory of the embedding cache
+    encode_batch_size = config['topic_modeling']['encode_batch_size']  # Messages per forward pass (embeddings)
+    encode_workers = config['topic_modeling']['encode_workers']  # Processes used to encode the messages
+    sample_size = config['topic_modeling']['sample_size']  # Messages in the sample the topic model is fitted on (0 = all)
+    assign_batch_size = config['topic_modeling']['assign_batch_size']  # Messages assigned per batch (sampled fit)
+    benchmark_sampling = config['topic_modeling']['benchmark_sampling']  # Compare the sampled fit with a full fit
+    online_path = config['topic_modeling']['online_model_path'] if config['topic_modeling']['online'] else None  # Online model (None = full retrain)
+    online_topics = config['topic_modeling']['online_topics']  # Number of topics of the online model
+    online_batch_size = config['topic_modeling']['online_batch_size']  # Messages per online update step
+    nr_topics = config['topic_modeling']['nr_topics']  # Topic reduction while fitting ("auto", a number, or None)
+    defer_representation = config['topic_modeling']['defer_representation']  # Represent only the reduced topics
+    reduction_cache = config['topic_modeling']['reduction_cache']  # Directory of the cached UMAP reduction
+    hdbscan_sweep = config['topic_modeling']['hdbscan_sweep']  # HDBSCAN settings tried by --sweep-hdbscan
+    sweep_workers = config['topic_modeling']['sweep_workers']  # Processes used by the sweep
+    openai_settings = config['topic_modeling']['openai']  # Model, endpoint, rate limit and label cache of the OpenAI labelling
+    parallel_stages = config['execution']['parallel_stages']  # Run the basic charts while the topic model is fitted
+    figure_workers = config['execution']['figure_workers']  # Threads writing the independent figures of a stage
+    static_images = config['static_images']  # Format and size of the static images of the charts (enabled: false = HTML only)
 
     # Make sure the directory exists
     os.makedirs(outputs_path, exist_ok=True)
     os.makedirs(outputs_path_TM, exist_ok=True)
 
-    NLP = SpacyNLP(language)
+    # Static images of every chart of the run, rendered in one batch once the stages are done
+    image_export = None
+    if static_images['enabled']:
+        from src.ImageExport import ImageExport
+        image_export = ImageExport(static_images['format'], static_images['width'], static_images['height'], static_images['scale'])
+
+    if args.replot_topics:
+        from src.TopicModeling import TopicModeling
+        topic_analyzer = TopicModeling.load(topic_model_path, outputs_path_TM, plotly_js_path=outputs_path, image_export=image_export)
+        save_topic_outputs(topic_analyzer, outputs_path_TM, n_topics_vis_pie, figure_workers)
+        if image_export:
+            image_export.export()
+        print(f"\n💾 Topic visualizations rebuilt in: {outputs_path_TM}")
+        return
+
     # Chat cleanup and loading
-    df_clean = DataProcessing.load_and_clean_data(gName, raw_path, processed_path)
+    df_clean = DataProcessing.load_and_clean_data(gName, raw_path, processed_path, batch_size, incremental, filters, workers)
+    # DataProcessing.memory_report(df_clean)  # Compare the compact schema with the object-dtype one
     print("✅ done!\n")
 
-    # Get stopwords for the language (wordcloud)
-    stopwords = NLP.get_stopwords()
-    print("✅ done!\n")
+    # Get stopwords for the language (wordcloud and topics)
+    if 'basic' in args.stages or 'topics' in args.stages or args.sweep_hdbscan:
+        from src.SpacyNLP import SpacyNLP
+        stopwords = SpacyNLP(language).get_stopwords()
+        print("✅ done!\n")
+
+    # Tokenize the chat once when the topic model is fitted on all of it: the word cloud reuses the same token table.
+    # Built on first use by whichever stage asks first (the stages may run concurrently); the other runs
+    # (basic charts only, online model, HDBSCAN sweep) never build it and the word cloud counts single words
+    token_counts = {}
+    token_counts_lock = threading.Lock()
+    def shared_token_counts():
+        if 'topics' not in args.stages or online_path or args.sweep_hdbscan:
+            return None
+        with token_counts_lock:
+            if 'table' not in token_counts:
+                from src.TokenCounts import TokenCounts
+                token_counts['table'] = TokenCounts.shared(df_clean['message'], list(stopwords))
+            return token_counts['table']
+
+    def new_topic_analyzer():
+        from src.TopicModeling import TopicModeling
+        return TopicModeling(
+            language, list(stopwords), api_key_openai, outputs_path_TM,
+            embedding_cache_path=embedding_cache,
+            encode_batch_size=encode_batch_size,
+            encode_workers=encode_workers,
+            sample_size=sample_size,
+            assign_batch_size=assign_batch_size,
+            online_path=online_path,
+            online_topics=online_topics,
+            online_batch_size=online_batch_size,
+            nr_topics=nr_topics,
+            defer_representation=defer_representation,
+            reduction_cache_path=reduction_cache,
+            openai_settings=openai_settings,
+            token_counts=shared_token_counts(),
+            plotly_js_path=outputs_path,
+            image_export=image_export,
+        )
+
+    if args.sweep_hdbscan:
+        new_topic_analyzer().sweep_hdbscan(df_clean, hdbscan_sweep, sweep_workers)
+        return
 
     # ------------------------------ BasicGraphs ------------------------------
-    basic_graph = BasicGraph(df_clean, outputs_path)
-    
-    # Crea i singoli grafici
-    basic_graph.create_heatmap()            # For PNG : basic_graph.create_heatmap(html = False) 
-    basic_graph.create_top_users(n_top_users)          # For PNG : basic_graph.create_top_users(html = False)
-    basic_graph.create_emoji_chart(n_top_emoji)        # For PNG : basic_graph.create_emoji_chart(html = False)
-    basic_graph.create_wordcloud(stopwords) # For PNG : basic_graph.create_wordcloud(stopwords, html = False)
+    def basic_stage():
+        from src.BasicGraphs import BasicGraph
+        basic_graph = BasicGraph(df_clean, outputs_path, image_export)
+        
+        # Crea i singoli grafici (independent: written by figure_workers threads)
+        run_tasks([
+            basic_graph.create_heatmap,                            # For PNG : basic_graph.create_heatmap(html = False) 
+            lambda: basic_graph.create_top_users(n_top_users),     # For PNG : basic_graph.create_top_users(html = False)
+            lambda: basic_graph.create_emoji_chart(n_top_emoji),   # For PNG : basic_graph.create_emoji_chart(html = False)
+            lambda: basic_graph.create_wordcloud(stopwords, shared_token_counts()),  # PNG only
+        ], figure_workers)
     # ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
 
     # ------------------------------ Topic Modeling spaCy ------------------------------
-    # Analisi topic
-    print("📑 Topic analysis...")
-    topic_analyzer = TopicModeling(language, list(stopwords), api_key_openai, outputs_path_TM)
-    topics, probs = topic_analyzer.fit_transform(df_clean)
-    
-    # get df of topic
-    df_topic = topic_analyzer.get_csv()
-    if outputs_path_TM:
-        os.makedirs(outputs_path_TM, exist_ok=True)
-        df_topic.to_csv(outputs_path_TM + "topic_info.csv", index=False)
+    def topics_stage():
+        # Analisi topic
+        print("📑 Topic analysis...")
+        topic_analyzer = new_topic_analyzer()
+        if online_path:
+            topics = topic_analyzer.partial_fit(df_clean)
+        else:
+            if benchmark_sampling and sample_size:
+                topic_analyzer.benchmark_sampling(df_clean)
+            topics, probs = topic_analyzer.fit_transform(df_clean)
+        topic_analyzer.save(topic_model_path)
 
+        save_topic_outputs(topic_analyzer, outputs_path_TM, n_topics_vis_pie, figure_workers)
+        print("\n✅ Analysis completed!")
+    # ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
 
-    # Salva visualizzazioni
-    topic_analyzer.save_vis_hierarchy()
-    topic_analyzer.save_vis_map()    
-    topic_analyzer.save_vis_barchart()
-    topic_analyzer.save_vis_topics_over_time()
-    custom_colors = ['#0088FE', '#00C49F', '#FFBB28', '#FF8042', '#8884d8']
-    topic_analyzer.save_vis_pie(
-        n_topics_vis_pie,
-        exclude_topics=[-1],
-        max_title_length=40,
-        n_examples=3,
-        color_sequence=custom_colors
+    # The basic charts do not depend on the topic model: with parallel_stages they are built during the fit
+    timings = {}
+    start = time.perf_counter()
+    stages = {'basic': basic_stage, 'topics': topics_stage}
+    run_tasks(
+        [timed(timings, name, stage) for name, stage in stages.items() if name in args.stages],
+        2 if parallel_stages else 1
     )
-    print("\n✅ Analysis completed!")
-    # ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+    if image_export:
+        image_export.export()
 
 
 
     # ------------------------------ Recap HTML ------------------------------
-    # Set the output directory and base URL (e.g., local file for testing)
-    base_url = f"file://{os.path.abspath(outputs_path)}/"
-    
-    
-    start_date = df_clean['date'].min().strftime('%d/%m/%Y')
-    end_date = df_clean['date'].max().strftime('%d/%m/%Y')
-
-    # Create an instance of the generator
-    generator = RecapPageGenerator(
-        outputs_path = outputs_path, 
-        base_url = base_url,
-        group_name = gName,
-        start_date= start_date,
-        end_date=  end_date
+    # Built after the stages above: the page only links their outputs, which exist now
+    if 'recap' in args.stages:
+        recap_start = time.perf_counter()
+        from src.RecapPageGenerator import RecapPageGenerator
+        # Set the output directory and base URL (e.g., local file for testing)
+        base_url = f"file://{os.path.abspath(outputs_path)}/"
+        
+        
+        start_date = df_clean['date'].min().strftime('%d/%m/%Y')
+        end_date = df_clean['date'].max().strftime('%d/%m/%Y')
+
+        # Create an instance of the generator
+        generator = RecapPageGenerator(
+            outputs_path = outputs_path, 
+            base_url = base_url,
+            group_name = gName,
+            start_date= start_date,
+            end_date=  end_date
+            )
+        
+        # Add optional graph, 
+        # you can duplicate this if you have another graph to show
+        generator.add_graph(
+            graph_id="custom1",
+            graph_url=f"{base_url}TopicModeling//topic_topics_over_time.html",
+            title="Topics Over Time",
+            icon="fas fa-chart-line"
         )
-    
-    # Add optional graph, 
-    # you can duplicate this if you have another graph to show
-    generator.add_graph(
-        graph_id="custom1",
-        graph_url=f"{base_url}TopicModeling//topic_topics_over_time.html",
-        title="Topics Over Time",
-        icon="fas fa-chart-line"
-    )
-    
-    # Save HTML 
-    generator.save_page()
+        
+        # Save HTML 
+        generator.save_page()
+        timings['recap'] = time.perf_counter() - recap_start
     # ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
 
-    print(f'\n💾 All charts have been successfully saved in: {outputs_path}')
+    # Wall-clock time of the run and time of each stage
+    # With parallel_stages the stages share the CPU while they overlap: each one runs slower than alone, so the
+    # sum of their times is not the time of a serial run (time a run with parallel_stages: false to compare)
+    elapsed = time.perf_counter() - start
+    print("\n⏱️ " + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in timings.items()))
+    if len(timings) > 1:
+        overlapped = " (measured while overlapping)" if parallel_stages and {'basic', 'topics'} <= set(timings) else ""
+        print(f"⏱️ Wall-clock {elapsed:.1f}s, sum of the stage times {sum(timings.values()):.1f}s{overlapped}")
+
+    print(f'\n💾 All charts of the stages {", ".join(args.stages)} have been saved in: {outputs_path}')
 
 
 if __name__ == '__main__':
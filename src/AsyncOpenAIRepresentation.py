@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import openai
+import pandas as pd
+from scipy.sparse import csr_matrix
+from typing import Mapping, List, Tuple, Optional
+from bertopic.representation import BaseRepresentation
+
+DEFAULT_PROMPT = """
+I have a topic that contains the following documents:
+[DOCUMENTS]
+The topic is described by the following keywords: [KEYWORDS]
+
+Based on the information above, extract a short topic label in the following format:
+topic: <topic label>
+"""
+
+# Token bucket: at most `rate` requests per second on average, with bursts of up to `capacity` requests
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncOpenAIRepresentation(BaseRepresentation):
+    # Topic labels from any OpenAI-compatible chat endpoint, requested concurrently:
+    #   requests_per_minute: token-bucket limit on the requests (bursts up to max_concurrency)
+    #   max_concurrency: requests in flight at the same time
+    #   base_url: endpoint of the API (None = OpenAI), e.g. a local server
+    #   label_cache_path: directory of the on-disk label cache (None to disable)
+    # A label is cached under a hash of the model, the prompt, the keywords and the representative documents
+    # of its topic: topics that did not change between runs are not requested again.
+    def __init__(
+        self,
+        api_key: Optional[str],
+        model: str = "gpt-3.5-turbo-0125",
+        base_url: Optional[str] = None,
+        requests_per_minute: int = 60,
+        max_concurrency: int = 8,
+        label_cache_path: Optional[str] = None,
+        prompt: str = DEFAULT_PROMPT,
+        nr_docs: int = 4,
+        diversity: Optional[float] = None,
+        doc_length: int = 300,
+        timeout: float = 30.0,
+        max_retries: int = 3,
+    ):
+        self.api_key = api_key or "none"  # Local endpoints usually ignore the key, the client requires one
+        self.model = model
+        self.base_url = base_url
+        self.requests_per_minute = requests_per_minute
+        self.max_concurrency = max_concurrency
+        self.label_cache_path = label_cache_path
+        self.prompt = prompt
+        self.nr_docs = nr_docs
+        self.diversity = diversity
+        self.doc_length = doc_length
+        self.timeout = timeout
+        self.max_retries = max_retries
+
+    # Called by BERTopic with the keywords (c-TF-IDF) of every topic: returns a label per topic
+    def extract_topics(
+        self,
+        topic_model,
+        documents: pd.DataFrame,
+        c_tf_idf: csr_matrix,
+        topics: Mapping[str, List[Tuple[str, float]]],
+    ) -> Mapping[str, List[Tuple[str, float]]]:
+        repr_docs_mappings, _, _, _ = topic_model._extract_representative_docs(
+            c_tf_idf, documents, topics, 500, self.nr_docs, self.diversity
+        )
+        prompts = {
+            topic: self.create_prompt(docs, topics[topic])
+            for topic, docs in repr_docs_mappings.items()
+        }
+
+        cache = self.load_cache()
+        keys = {topic: self.cache_key(prompt) for topic, prompt in prompts.items()}
+        missing = {topic: prompt for topic, prompt in prompts.items() if keys[topic] not in cache}
+        print(f"🏷️ Topic labels: {len(prompts) - len(missing)} cached, {len(missing)} to request")
+        if missing:
+            start = time.perf_counter()
+            labels = asyncio.run(self.request_labels(missing))
+            received = {topic: label for topic, label in labels.items() if label is not None}
+            print(f"🏷️ {len(received)} labels received in {time.perf_counter() - start:.1f}s")
+            if len(received) < len(labels):
+                print(f"⚠️ {len(labels) - len(received)} requests failed: their topics are labelled with their keywords")
+            for topic, label in received.items():
+                cache[keys[topic]] = label
+            self.save_cache(cache)
+
+        return {
+            topic: [(cache.get(keys[topic]) or ", ".join(word for word, _ in topics[topic][:3]), 1)] + [("", 0) for _ in range(9)]
+            for topic in prompts
+        }
+
+    def create_prompt(self, docs: List[str], keywords: List[Tuple[str, float]]) -> str:
+        documents = "".join(f"- {doc[:self.doc_length]}\n" for doc in docs)
+        return (
+            self.prompt
+            .replace("[KEYWORDS]", ", ".join(word for word, _ in keywords))
+            .replace("[DOCUMENTS]", documents)
+        )
+
+    def cache_key(self, prompt: str) -> str:
+        return hashlib.sha256(f"{self.model}\n{prompt}".encode('utf-8')).hexdigest()
+
+    # Request all the labels concurrently (a fresh client per run: the event loop is new every time)
+    async def request_labels(self, prompts: Mapping[int, str]) -> Mapping[int, str]:
+        bucket = TokenBucket(self.requests_per_minute / 60, self.max_concurrency)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with openai.AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            timeout=self.timeout,
+            max_retries=self.max_retries,  # Retries 429 and 5xx responses with exponential backoff
+        ) as client:
+            async def request(topic, prompt):
+                async with semaphore:
+                    await bucket.acquire()
+                    try:
+                        response = await client.chat.completions.create(
+                            model=self.model,
+                            messages=[
+                                {"role": "system", "content": "You are a helpful assistant."},
+                                {"role": "user", "content": prompt},
+                            ],
+                        )
+                    except openai.OpenAIError as e:
+                        print(f"❌ Labelling topic {topic} failed: {str(e)}")
+                        return topic, None
+                label = (response.choices[0].message.content or "").strip().replace("topic: ", "")
+                return topic, label
+
+            results = await asyncio.gather(*(request(topic, prompt) for topic, prompt in prompts.items()))
+        return dict(results)
+
+    def load_cache(self) -> dict:
+        if not self.label_cache_path:
+            return {}
+        path = os.path.join(self.label_cache_path, 'labels.json')
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding='utf-8') as fp:
+            return json.load(fp)
+
+    def save_cache(self, cache: dict) -> None:
+        if not self.label_cache_path:
+            return
+        os.makedirs(self.label_cache_path, exist_ok=True)
+        path = os.path.join(self.label_cache_path, 'labels.json')
+        with open(path + '.tmp', 'w', encoding='utf-8') as fp:
+            json.dump(cache, fp, ensure_ascii=False, indent=2)
+        os.replace(path + '.tmp', path)
@@ -1,8 +1,11 @@
+import numpy as np
 import pandas as pd
 import plotly.express as px
-import emoji
-from collections import defaultdict
 from wordcloud import WordCloud
+from src.EmojiCounter import EmojiCounter
+from src.TokenCounts import TokenCounts
+from src.PlotlyAsset import PlotlyAsset
+from src.ImageExport import ImageExport
 
 
 
@@ -11,32 +14,62 @@ from wordcloud import WordCloud
 
 class BasicGraph:
 
-    def __init__(self, df : pd.DataFrame, outputs_path : str):
-        self.df = df.copy()
+    # image_export: batch export of the static images of the run (ImageExport), None for the HTML pages only
+    def __init__(self, df : pd.DataFrame, outputs_path : str, image_export : ImageExport = None):
+        # No copy: the charts only read the (compact) cleaned DataFrame
+        self.df = df
         self.outputs_path = outputs_path
+        self.plotly_js = PlotlyAsset(outputs_path)
+        self.image_export = image_export
+        self.activity = self.build_activity_cube()
+
+    # Messages per (user, day, hour), with the weekday of the day: every activity chart is an aggregation
+    # of this table. Built in one pass from the integer timestamps (no per-row strings), only the
+    # non-empty cells are kept: at most users x days x 24 rows, whatever the number of messages.
+    def build_activity_cube(self) -> pd.DataFrame:
+        seconds = self.df['date'].to_numpy().astype('datetime64[s]').astype(np.int64)
+        users = self.df['user'].astype('category')
+        days = seconds // 86_400
+        first_day = days.min() if len(days) else 0
+        n_days = days.max() - first_day + 1 if len(days) else 1
+
+        cell = (users.cat.codes.to_numpy().astype(np.int64) * n_days + (days - first_day)) * 24 + (seconds % 86_400) // 3_600
+        n_cells = len(users.cat.categories) * n_days * 24
+        if n_cells <= 4 * len(cell) + 1_000_000:  # Dense count array of a few cells per message: one linear pass
+            counts = np.bincount(cell, minlength=n_cells)
+            cells = np.flatnonzero(counts)
+            counts = counts[cells]
+        else:  # Long, sparse chat (many users over many years): sort the cells instead
+            cells, counts = np.unique(cell, return_counts=True)
+        day = (cells // 24) % n_days + first_day
+        return pd.DataFrame({
+            'user': pd.Categorical.from_codes(cells // 24 // n_days, categories=users.cat.categories),
+            'date': (day * 86_400).astype('datetime64[s]'),
+            'weekday': ((day + 3) % 7).astype(np.int8),  # 1970-01-01 was a Thursday (Monday = 0)
+            'hour': (cells % 24).astype(np.int8),
+            'messages': counts.astype(np.int32),
+        })
+
+    # HTML page of a chart and its static image: queued in the batch export of the run when there is one,
+    # else written right away as a PNG (html=False)
+    def save_figure(self, fig, name: str, html: bool) -> None:
+        if html:
+            self.plotly_js.write_html(fig, self.outputs_path + name + ".html")
+        if self.image_export is not None:
+            self.image_export.add(fig, self.outputs_path + name)
+        elif not html:
+            fig.write_image(self.outputs_path + name + ".png")
 
     # Creating a heatmap
     def create_heatmap(self, html : bool = True) -> None:
         print("⏳ Creating  a heatmap...")
 
-        self.df['hour'] = self.df['date'].dt.hour
-        self.df['day_of_week'] = self.df['date'].dt.day_name()
-
         # Sort the days of the week
         day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        self.df['day_of_week'] = (
-            pd.Categorical(self.df['day_of_week'], 
-            categories=day_order, 
-            ordered=True)
-        )
         
         # Create a matrix for the heatmap
-        heatmap_data = (
-            self.df.groupby(['day_of_week', 'hour'], observed=True)
-            .size()
-            .reset_index(name='messages')
-            .sort_values(['day_of_week', 'hour'])   
-        )
+        heatmap_data = self.activity.groupby(['weekday', 'hour'])['messages'].sum().reset_index()
+        heatmap_data['day_of_week'] = pd.Categorical.from_codes(heatmap_data['weekday'], categories=day_order, ordered=True)
         
         fig = px.density_heatmap(
             heatmap_data,
@@ -58,12 +91,8 @@ class BasicGraph:
         
         fig.update_coloraxes(showscale=False)
 
-        if html:
-            # Save HTML file
-            fig.write_html( self.outputs_path + "heatmap.html")
-        else:
-            # Save PNG file
-            fig.write_image( self.outputs_path + "heatmap.png") 
+        # Save HTML file (and/or static image)
+        self.save_figure(fig, "heatmap", html)
 
         print(f"✅ File saved in: { self.outputs_path}\n")
 
@@ -72,7 +101,11 @@ class BasicGraph:
         print("⏳ Creating  a Top Users barchart...")
         
         # Count Messages
-        user_counts = self.df['user'].value_counts().reset_index()
+        user_counts = (
+            self.activity.groupby('user', observed=True)['messages'].sum()
+            .sort_values(ascending=False, kind='stable')
+            .reset_index()
+        )
         user_counts.columns = ['user', 'count']
 
         # Top 10 Users
@@ -97,12 +130,8 @@ class BasicGraph:
         fig.update_coloraxes(showscale=False)
         
 
-        if html:
-            # Save HTML file
-            fig.write_html( self.outputs_path + "TopUsers.html")
-        else:
-            # Save PNG file
-            fig.write_image( self.outputs_path + "TopUsers.png" ) 
+        # Save HTML file (and/or static image)
+        self.save_figure(fig, "TopUsers", html)
 
         print(f"✅ File saved in: { self.outputs_path}\n")
 
@@ -110,18 +139,17 @@ class BasicGraph:
     def create_emoji_chart(self, n_top_emoji: int = 5, html: bool = True) -> None:
         print("⏳ Creating an emoji chart...")
     
-        # Count the emojis
-        emoji_freq = defaultdict(int)
-        for message in self.df['message']:
-            emojis = ''.join(char for char in message if char in emoji.EMOJI_DATA)
-            for emoji_char in emojis:
-                emoji_freq[emoji_char] += 1
+        # Count the emojis (whole sequences: flags, skin tones, families...), per user and per month
+        self.emoji_counts = EmojiCounter().count(self.df)
 
         # Create a DataFrame with the top emojis
-        df_emoji = pd.DataFrame(
-            sorted(emoji_freq.items(), key=lambda x: x[1], reverse=True)[:n_top_emoji],
-            columns=['Emoji', 'Count']
+        df_emoji = (
+            self.emoji_counts.groupby('emoji')['count'].sum()
+            .sort_values(ascending=False, kind='stable')
+            .head(n_top_emoji)
+            .reset_index()
         )
+        df_emoji.columns = ['Emoji', 'Count']
 
         # Create the chart
         fig = px.bar(
@@ -144,28 +172,31 @@ class BasicGraph:
         fig.update_coloraxes(showscale=False)
 
 
-        if html:
-            # Save HTML file
-            fig.write_html( self.outputs_path + "EmojiChart.html" ) 
-        else:
-            # Save PNG file
-            fig.write_image( self.outputs_path + "EmojiChart.png" ) 
+        # Save HTML file (and/or static image)
+        self.save_figure(fig, "EmojiChart", html)
             
         print(f"✅ File saved in: { self.outputs_path}\n")
     
     # Creating a WordCloud
-    def create_wordcloud(self, stopwords: set) -> None:
-        print("⏳ Creating an emoji chart...")
+    # token_counts: the shared document-term table of the messages (stopwords already removed), None to count
+    # the single words of the messages here
+    def create_wordcloud(self, stopwords: set, token_counts: TokenCounts = None) -> None:
+        print("⏳ Creating a wordcloud...")
         
-        # Concatenate all messages into a single string
-        words = self.df['message'].astype(str).str.cat(sep=' ')
+        # Word frequencies from the token table: the messages are not joined nor tokenized again
+        if token_counts is None:
+            try:
+                token_counts = TokenCounts(TokenCounts.new_word_vectorizer(list(stopwords)), self.df['message'])
+            except ValueError:
+                print("⚠️ No words left after removing the stopwords: no wordcloud\n")
+                return
+        frequencies = token_counts.word_frequencies()
         
         # Create a PNG
         fig = WordCloud(
             width=1000, 
             height=800,
-            stopwords=stopwords,
-        ).generate(words)
+        ).generate_from_frequencies(frequencies)
 
         # Save PNG file
         fig.to_file( self.outputs_path + "wordcloud.png" ) 
@@ -0,0 +1,91 @@
+import os
+import json
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from typing import Optional, List
+
+class ChatStore:
+    # On-disk store of the processed chat:
+    #   <path>/YYYY-MM.arrow  one uncompressed Arrow (Feather v2) file per month, memory-mapped on load
+    #   <path>/manifest.json  hash of the raw export and of the settings the store was built with
+    SCHEMA = pa.schema([
+        ('date', pa.timestamp('s')),
+        ('user', pa.dictionary(pa.int32(), pa.string())),
+        ('message', pa.string()),
+    ])
+    MANIFEST = 'manifest.json'
+
+    def __init__(self, path: str):
+        self.path = path
+
+    # Return the manifest if the store was built with the same settings, else None
+    def read_manifest(self, settings: dict) -> Optional[dict]:
+        manifest_path = os.path.join(self.path, self.MANIFEST)
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path, encoding='utf-8') as fp:
+            manifest = json.load(fp)
+        if manifest.get('settings') != settings:
+            print("⚠️ The processed chat was built with different settings: full rebuild")
+            return None
+        if not all(os.path.exists(os.path.join(self.path, name)) for name in manifest['partitions']):
+            print("⚠️ The processed chat is incomplete: full rebuild")
+            return None
+        return manifest
+
+    def write_manifest(self, manifest: dict) -> None:
+        manifest_path = os.path.join(self.path, self.MANIFEST)
+        with open(manifest_path + '.tmp', 'w', encoding='utf-8') as fp:
+            json.dump(manifest, fp, indent=2)
+        os.replace(manifest_path + '.tmp', manifest_path)
+
+    # Load the whole chat (memory-mapped: strings and timestamps are not copied)
+    def load(self, manifest: dict) -> pd.DataFrame:
+        tables = [self.read_partition(name, memory_map=True) for name in manifest['partitions']]
+        table = pa.concat_tables(tables) if tables else self.SCHEMA.empty_table()
+        return table.to_pandas(types_mapper={pa.string(): pd.StringDtype('pyarrow')}.get)
+
+    def read_partition(self, name: str, memory_map: bool = False) -> pa.Table:
+        path = os.path.join(self.path, name)
+        source = pa.memory_map(path) if memory_map else pa.OSFile(path)
+        table = pa.ipc.open_file(source).read_all()
+        if not memory_map:
+            source.close()
+        return table
+
+    # Write the partitions of the given rows, one file per month
+    # existing: partitions already in the store, new rows of an existing month are appended to it
+    def write_partitions(self, df: pd.DataFrame, existing: List[str] = ()) -> List[str]:
+        os.makedirs(self.path, exist_ok=True)
+        months = df['date'].to_numpy().astype('datetime64[M]')
+        written = []
+        for month, rows in pd.Series(range(len(df))).groupby(months, sort=True):
+            name = f"{pd.Timestamp(month):%Y-%m}.arrow"
+            table = self.to_table(df.iloc[rows.to_numpy()])
+            if name in existing:
+                table = pa.concat_tables([self.read_partition(name), table])
+            # Write to a temporary file first, so an interrupted run never leaves a truncated partition
+            feather.write_feather(table, os.path.join(self.path, name + '.tmp'), compression='uncompressed')
+            os.replace(os.path.join(self.path, name + '.tmp'), os.path.join(self.path, name))
+            written.append(name)
+        return written
+
+    # Full rewrite of the store
+    def write(self, df: pd.DataFrame, manifest: dict) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        old_partitions = [name for name in os.listdir(self.path) if name.endswith('.arrow')]
+        manifest['partitions'] = self.write_partitions(df)
+        for name in set(old_partitions) - set(manifest['partitions']):
+            os.remove(os.path.join(self.path, name))
+        self.write_manifest(manifest)
+
+    # Append new rows (not older than the stored ones): only the last month and the new ones are rewritten
+    def append(self, df_new: pd.DataFrame, manifest: dict) -> None:
+        written = self.write_partitions(df_new, existing=manifest['partitions'])
+        manifest['partitions'] = sorted(set(manifest['partitions']) | set(written))
+        self.write_manifest(manifest)
+
+    def to_table(self, df: pd.DataFrame) -> pa.Table:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        return table.replace_schema_metadata(None).cast(self.SCHEMA)
@@ -1,89 +1,506 @@
 import re
+import os
+import hashlib
+import zipfile
+import itertools
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
-from typing import Set, Tuple, List
+from pandas.api.types import union_categoricals
+from typing import Set, Tuple, List, Iterable, Iterator, Optional, NamedTuple, BinaryIO
+from src.ChatStore import ChatStore
+from src.MessageFilter import MessageFilter
+
+# A WhatsApp export layout
+#   header: start of a message, with the named groups date, time, ampm (12-hour exports only), user, message
+#   boundary: any line opening with a timestamp, it closes the previous message
+#             (even system notices without a "user: " part, e.g. "‎You created group")
+#   date_format: format of "date time[ ampm]" for pd.to_datetime
+class ExportFormat(NamedTuple):
+    header: re.Pattern
+    boundary: re.Pattern
+    date_format: str
+
 
 class DataProcessing: 
-    def load_and_clean_data(gName: str, raw_path: str, processed_path: str):
+    # Supported export formats (WhatsApp sometimes prefixes the lines with an invisible LRM mark, U+200E,
+    # and separates the time from AM/PM with a narrow no-break space, U+202F)
+    EXPORT_FORMATS = {
+        # iOS: "[26/09/24, 22:27:42] Raffo🍪: hi girlz"
+        'ios': ExportFormat(
+            header=re.compile(r'^\u200e?\[(?P<date>\d{2}/\d{2}/\d{2}), (?P<time>\d{1,2}:\d{2}:\d{2})(?P<ampm>)\] (?P<user>[^:]+): (?P<message>.*)'),
+            boundary=re.compile(r'^\u200e?\[\d{2}/\d{2}/\d{2}, \d{1,2}:\d{2}:\d{2}\]'),
+            date_format='%d/%m/%y %H:%M:%S',
+        ),
+        # iOS, 12-hour clock: "[26/09/24, 10:27:42 PM] Raffo🍪: hi girlz"
+        'ios_12h': ExportFormat(
+            header=re.compile(r'^\u200e?\[(?P<date>\d{2}/\d{2}/\d{2}), (?P<time>\d{1,2}:\d{2}:\d{2})[ \u202f](?P<ampm>[AaPp][Mm])\] (?P<user>[^:]+): (?P<message>.*)'),
+            boundary=re.compile(r'^\u200e?\[\d{2}/\d{2}/\d{2}, \d{1,2}:\d{2}:\d{2}[ \u202f][AaPp][Mm]\]'),
+            date_format='%d/%m/%y %I:%M:%S %p',
+        ),
+        # Android: "26/09/2024, 22:27 - Raffo🍪: hi girlz"
+        'android': ExportFormat(
+            header=re.compile(r'^\u200e?(?P<date>\d{2}/\d{2}/\d{4}), (?P<time>\d{1,2}:\d{2})(?P<ampm>) - (?P<user>[^:]+): (?P<message>.*)'),
+            boundary=re.compile(r'^\u200e?\d{2}/\d{2}/\d{4}, \d{1,2}:\d{2} - '),
+            date_format='%d/%m/%Y %H:%M',
+        ),
+        # Android, 12-hour clock: "26/09/2024, 10:27 pm - Raffo🍪: hi girlz"
+        'android_12h': ExportFormat(
+            header=re.compile(r'^\u200e?(?P<date>\d{2}/\d{2}/\d{4}), (?P<time>\d{1,2}:\d{2})[ \u202f](?P<ampm>[AaPp][Mm]) - (?P<user>[^:]+): (?P<message>.*)'),
+            boundary=re.compile(r'^\u200e?\d{2}/\d{2}/\d{4}, \d{1,2}:\d{2}[ \u202f][AaPp][Mm] - '),
+            date_format='%d/%m/%Y %I:%M %p',
+        ),
+    }
+    SNIFF_BYTES = 16 * 1024
+
+    # Labels of the users in the charts (edit to rename or merge users)
+    USER_ALIASES = {
+        'PippoFranco': 'User1',       # Renaming 'PippoFranco' to 'User1'
+        'PaoloRuffini': 'User2',       # Renaming 'PaoloRuffini' to 'User2'
+        'ElioELeStorieTese' : 'User3',         # ...
+        'Brelusconi' : 'User4',
+    }
+
+    # Version of the processed store: bump it whenever a change to the parsing or the cleaning changes its
+    # output, the stores built by the previous code are then rebuilt instead of reused
+    STORE_VERSION = 1
+
+    # Pick the export format from the first few KB of the file (the one matching most lines)
+    def sniff_format(raw_path: str) -> ExportFormat:
+        with DataProcessing.open_chat(raw_path) as fp:
+            head = fp.read(DataProcessing.SNIFF_BYTES).decode('utf-8', errors='ignore')
+        lines = head.splitlines()
+        scores = {
+            name: sum(1 for line in lines if export_format.header.match(line))
+            for name, export_format in DataProcessing.EXPORT_FORMATS.items()
+        }
+        name = max(scores, key=scores.get)
+        if not scores[name]:
+            print("❌ Unrecognized chat format. Supported formats:", ', '.join(DataProcessing.EXPORT_FORMATS))
+            raise ValueError(f"Unrecognized WhatsApp export format: {raw_path}")
+        print(f"🔎 Chat format: {name}")
+        return DataProcessing.EXPORT_FORMATS[name]
+
+    # Stream the chat line by line and yield the parsed messages in batches
+    #   lines: any iterable of text lines (e.g. an open file)
+    #   export_format: layout of the chat (see sniff_format)
+    #   batch_size: number of messages per yielded batch
+    # Lines that do not start with a timestamp are continuations of the previous message.
+    def iter_message_batches(lines: Iterable[str], export_format: ExportFormat, batch_size: int = 50_000) -> Iterator[List[Tuple[str, str, str, str, str]]]:
+        header, boundary = export_format.header, export_format.boundary
+        batch = []
+        current = None  # [date, time, ampm, user, [message lines]]
+        for line in lines:
+            line = line.rstrip('\r\n')
+            if boundary.match(line):
+                if current is not None:
+                    batch.append((current[0], current[1], current[2], current[3], ' '.join(current[4]).strip()))
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+                match = header.match(line)
+                current = [match['date'], match['time'], match['ampm'], match['user'], [match['message']]] if match else None
+            elif current is not None:
+                current[4].append(line)  # Combine multiline messages
+
+        if current is not None:
+            batch.append((current[0], current[1], current[2], current[3], ' '.join(current[4]).strip()))
+        if batch:
+            yield batch
+
+    # Read a binary file line by line, decoding each line and feeding the raw bytes to the hasher
+    def read_lines(fp, hasher) -> Iterator[str]:
+        for raw_line in fp:
+            hasher.update(raw_line)
+            yield raw_line.decode('utf-8')
+
+    # Parse and clean a stream of lines batch by batch, then merge the batches
+    # Memory stays proportional to the batch size and not to the size of the export
+    def parse_and_clean(lines: Iterable[str], gName: str, message_filter: MessageFilter, export_format: ExportFormat, batch_size: int = 50_000) -> pd.DataFrame:
+        cleaned_batches = [
+            DataProcessing.clean_batch(batch, gName, message_filter, export_format)
+            for batch in DataProcessing.iter_message_batches(lines, export_format, batch_size)
+        ]
+        return DataProcessing.concat_clean(cleaned_batches or [DataProcessing.clean_batch([], gName, message_filter, export_format)])
+
+    # Concatenate cleaned frames (each one has its own user categories: merge them first)
+    def concat_clean(frames: List[pd.DataFrame]) -> pd.DataFrame:
+        frames = [frame for frame in frames if len(frame)] or frames[:1]
+        # (sorted categories: the result does not depend on how the chat was split)
+        users = union_categoricals([frame['user'].array for frame in frames], sort_categories=True)
+        df_clean = pd.concat([frame.drop(columns='user') for frame in frames], ignore_index=True)
+        df_clean.insert(1, 'user', users.remove_unused_categories())
+        return df_clean
+
+    # Raw chat sources: a "_chat.txt" file, a WhatsApp "Export chat" zip, or a directory of zips
+    def list_sources(raw_path: str) -> List[str]:
+        if not os.path.isdir(raw_path):
+            return [raw_path]
+        sources = sorted(
+            os.path.join(raw_path, name) for name in os.listdir(raw_path)
+            if name.lower().endswith('.zip')
+        )
+        if not sources:
+            raise FileNotFoundError(f"No WhatsApp export (.zip) found in: {raw_path}")
+        return sources
+
+    def is_zip(source: str) -> bool:
+        return source.lower().endswith('.zip')
+
+    # Chat text inside an export zip: "_chat.txt" (iOS) or the only .txt file (Android), media entries are ignored
+    def chat_member(archive: zipfile.ZipFile) -> zipfile.ZipInfo:
+        texts = [info for info in archive.infolist() if info.filename.lower().endswith('.txt')]
+        for info in texts:
+            if os.path.basename(info.filename) == '_chat.txt':
+                return info
+        if not texts:
+            raise ValueError(f"No chat (.txt) found in: {archive.filename}")
+        return texts[0]
+
+    # Open the chat text of a source as a binary stream (zips are streamed, nothing is extracted to disk)
+    @contextmanager
+    def open_chat(source: str) -> Iterator[BinaryIO]:
+        if DataProcessing.is_zip(source):
+            with zipfile.ZipFile(source) as archive, archive.open(DataProcessing.chat_member(archive)) as fp:
+                yield fp
+        else:
+            with open(source, 'rb') as fp:
+                yield fp
+
+    # Size in bytes of the chat text (uncompressed, for zips)
+    def chat_size(source: str) -> int:
+        if DataProcessing.is_zip(source):
+            with zipfile.ZipFile(source) as archive:
+                return DataProcessing.chat_member(archive).file_size
+        return os.path.getsize(source)
+
+    # Load the cleaned chat
+    #   raw_path: the chat file, an export zip, or a directory of export zips (ingested together)
+    #   processed_path: directory of the processed store (see ChatStore)
+    #   incremental: if the export grew, parse only the new messages and append them to the store
+    #   filters: drop/strip rules (the "filters" section of config.yaml, see MessageFilter)
+    #   workers: processes used to parse the chat on a full rebuild (1 = serial, plain text files only)
+    # The raw export is parsed only when the store was not built from it (same hash, same settings).
+    def load_and_clean_data(gName: str, raw_path: str, processed_path: str, batch_size: int = 50_000, incremental: bool = False, filters: Optional[dict] = None, workers: int = 1):
         print("⏳ Processing and cleaning the chat...") 
-        # Read the file
-        with open(raw_path, encoding="utf-8") as fp:
-            data = fp.read() 
-
-        # Separate Date - User - Message: "[26/09/24, 22:27:42] Raffo🍪: hi girlz"
-        # Advanced regex to capture all components
-        pattern = r'''
-        \[                      # Opening date bracket
-        (\d{2}/\d{2}/\d{2})     # Date (dd/mm/yy)
-        ,\s
-        (\d{1,2}:\d{2}:\d{2})   # Time (hh:mm:ss)
-        \]\s
-        ([^:]+)                 # Username (everything until the colon)
-        :\s
-        (.*?)                   # Message (non-greedy)
-        (?=\[|\Z)               # Look ahead for the next date or end of text
-        '''
-        matches = re.findall(pattern, data, re.VERBOSE | re.DOTALL)
+        store = ChatStore(processed_path)
+        message_filter = MessageFilter.from_config(filters)
+        settings = {
+            'store_version': DataProcessing.STORE_VERSION,
+            'user_aliases': DataProcessing.USER_ALIASES,
+            'group_name': gName,
+            'drop_messages': message_filter.drop_messages,
+            'strip_messages': message_filter.strip_messages,
+        }
+        sources = DataProcessing.list_sources(raw_path)
+        raw_size = sum(DataProcessing.chat_size(source) for source in sources)
+        raw_mtime_ns = max(os.stat(source).st_mtime_ns for source in sources)
+
+        def load_store(manifest):
+            print(f"♻️ Loading the processed chat from: {processed_path}")
+            if manifest['raw_mtime_ns'] != raw_mtime_ns:
+                # Same content, only touched: remember the new modification time
+                manifest['raw_mtime_ns'] = raw_mtime_ns
+                store.write_manifest(manifest)
+            return store.load(manifest)
+
+        manifest = store.read_manifest(settings)
+        if manifest is not None:
+            # Same files as last time (size and modification time): no need to hash them again
+            if (manifest['raw_size'], manifest['raw_mtime_ns']) == (raw_size, raw_mtime_ns):
+                return load_store(manifest)
+
+            if len(sources) > 1:
+                # Several exports: any change in their content means a full rebuild
+                hasher = hashlib.sha256()
+                for source in sources:
+                    with DataProcessing.open_chat(source) as fp:
+                        DataProcessing.hash_prefix(fp, DataProcessing.chat_size(source), hasher)
+                if hasher.hexdigest() == manifest['raw_sha256'] and raw_size == manifest['raw_size']:
+                    return load_store(manifest)
+            else:
+                with DataProcessing.open_chat(sources[0]) as fp:
+                    hasher = DataProcessing.hash_prefix(fp, manifest['raw_size'])
+                    if hasher.hexdigest() != manifest['raw_sha256']:
+                        print("⚠️ The export no longer starts with the ingested chat: full rebuild")
+                    elif raw_size == manifest['raw_size']:
+                        return load_store(manifest)
+                    elif incremental:
+                        # A new export is the old one plus new messages at the end
+                        export_format = DataProcessing.sniff_format(sources[0])
+                        df_new = DataProcessing.parse_tail(fp, hasher, gName, message_filter, export_format, batch_size, manifest['last_timestamp'])
+                        if df_new is not None:
+                            store.append(df_new, DataProcessing.update_manifest(manifest, fp.tell(), hasher, raw_mtime_ns, df_new))
+                            print(f"➕ {len(df_new)} new messages appended to the processed chat")
+                            message_filter.report()
+                            return store.load(manifest)
+
+        # Full rebuild
+        if len(sources) > 1:
+            df_clean, hasher = DataProcessing.parse_sources(sources, gName, message_filter, batch_size)
+        elif workers > 1 and not DataProcessing.is_zip(sources[0]):
+            export_format = DataProcessing.sniff_format(sources[0])
+            df_clean, raw_size, hasher = DataProcessing.parse_parallel(sources[0], gName, message_filter, export_format, batch_size, workers)
+        else:
+            export_format = DataProcessing.sniff_format(sources[0])
+            hasher = hashlib.sha256()
+            with DataProcessing.open_chat(sources[0]) as fp:
+                df_clean = DataProcessing.parse_and_clean(DataProcessing.read_lines(fp, hasher), gName, message_filter, export_format, batch_size)
+                raw_size = fp.tell()
+        manifest = DataProcessing.update_manifest({'settings': settings}, raw_size, hasher, raw_mtime_ns, df_clean)
+        message_filter.report()
+
+        # Save the cleaned data as one Arrow file per month
+        store.write(df_clean, manifest)
+
+        return df_clean
 
+    # Parse several exports (e.g. one zip per week) into a single chat:
+    # messages are sorted by date and the ones present in more than one export are kept once
+    # (a message legitimately repeated inside one export, e.g. "ok" twice in the same second, is kept twice)
+    def parse_sources(sources: List[str], gName: str, message_filter: MessageFilter, batch_size: int):
+        hasher = hashlib.sha256()
+        frames = []
+        for source in sources:
+            print(f"📦 {os.path.basename(source)}")
+            export_format = DataProcessing.sniff_format(source)
+            with DataProcessing.open_chat(source) as fp:
+                frames.append(DataProcessing.parse_and_clean(DataProcessing.read_lines(fp, hasher), gName, message_filter, export_format, batch_size))
+        df_clean = DataProcessing.concat_clean(frames)
+        # n-th occurrence of each message inside its own export
+        occurrence = pd.concat([frame.groupby(list(frame.columns), observed=True).cumcount() for frame in frames], ignore_index=True)
+        duplicated = pd.concat([df_clean, occurrence.rename('occurrence')], axis=1).duplicated()
+        df_clean = df_clean[~duplicated.to_numpy()].sort_values('date', kind='stable').reset_index(drop=True)
+        return df_clean, hasher
+
+    # Parse the chat in a process pool: the file is split into byte ranges starting on a message
+    # boundary, each range is parsed and cleaned by a worker, and the results are concatenated in order.
+    # The output is identical to the serial path. Returns (cleaned chat, bytes hashed, hasher).
+    def parse_parallel(raw_path: str, gName: str, message_filter: MessageFilter, export_format: ExportFormat, batch_size: int, workers: int):
+        offsets = DataProcessing.split_offsets(raw_path, export_format, workers * 4)  # More chunks than workers: better balance
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(DataProcessing.parse_range, raw_path, start, end, gName, message_filter, export_format, batch_size)
+                for start, end in zip(offsets[:-1], offsets[1:])
+            ]
+            # Hash the file while the workers parse it
+            with open(raw_path, 'rb') as fp:
+                hasher = DataProcessing.hash_prefix(fp, offsets[-1])
+            results = [future.result() for future in futures]
+
+        for _, hits in results:
+            for rule, count in hits.items():
+                message_filter.hits[rule] += count
+        frames = [df for df, _ in results]
+        if not frames:
+            frames.append(DataProcessing.clean_batch([], gName, message_filter, export_format))
+        return DataProcessing.concat_clean(frames), offsets[-1], hasher
+
+    # Byte offsets splitting the file into about n_chunks ranges, each starting on a message header
+    def split_offsets(raw_path: str, export_format: ExportFormat, n_chunks: int) -> List[int]:
+        size = os.path.getsize(raw_path)
+        offsets = [0]
+        with open(raw_path, 'rb') as fp:
+            for k in range(1, n_chunks):
+                fp.seek(max(size * k // n_chunks, offsets[-1]))
+                fp.readline()  # Skip the (partial) current line
+                start = fp.tell()
+                line = fp.readline()
+                while line and not export_format.boundary.match(line.decode('utf-8', errors='ignore')):
+                    start = fp.tell()
+                    line = fp.readline()
+                if not line:
+                    break
+                offsets.append(start)
+        offsets.append(size)
+        return offsets
+
+    # Worker: parse and clean the bytes [start, end) of the chat
+    def parse_range(raw_path: str, start: int, end: int, gName: str, message_filter: MessageFilter, export_format: ExportFormat, batch_size: int):
+        def read_range(fp):
+            position = start
+            for raw_line in fp:
+                if position >= end:
+                    break
+                position += len(raw_line)
+                yield raw_line.decode('utf-8')
+
+        with open(raw_path, 'rb') as fp:
+            fp.seek(start)
+            df = DataProcessing.parse_and_clean(read_range(fp), gName, message_filter, export_format, batch_size)
+        return df, message_filter.hits
+
+    # Hash the first `size` bytes of the raw file (into a new hasher, or an existing one)
+    def hash_prefix(fp, size: int, hasher=None):
+        hasher = hasher or hashlib.sha256()
+        remaining = size
+        while remaining:
+            chunk = fp.read(min(remaining, 1 << 20))
+            if not chunk:
+                break
+            hasher.update(chunk)
+            remaining -= len(chunk)
+        return hasher
+
+    # Manifest of the store: which part of which raw file it covers
+    #   raw_size: bytes of the raw file already ingested
+    #   raw_sha256: hash of those bytes (to verify that a new export starts with them)
+    #   last_timestamp: most recent message already ingested
+    def update_manifest(manifest: dict, raw_size: int, hasher, raw_mtime_ns: int, df_new: pd.DataFrame) -> dict:
+        last_timestamp = df_new['date'].max()
+        if not pd.isna(last_timestamp):
+            manifest['last_timestamp'] = last_timestamp.isoformat()
+        manifest.setdefault('last_timestamp', None)
+        manifest['raw_size'] = raw_size
+        manifest['raw_sha256'] = hasher.hexdigest()
+        manifest['raw_mtime_ns'] = raw_mtime_ns
+        return manifest
+
+    # Parse only the tail of the raw file (fp is positioned at the end of the ingested part)
+    # Returns None when a full rebuild is needed
+    def parse_tail(fp, hasher, gName: str, message_filter: MessageFilter, export_format: ExportFormat, batch_size: int, last_timestamp: Optional[str]) -> Optional[pd.DataFrame]:
+        # The tail must start with a new message, not in the middle of the last one
+        lines = DataProcessing.read_lines(fp, hasher)
+        first_line = next((line for line in lines if line.strip()), None)
+        if first_line is not None and not export_format.boundary.match(first_line):
+            print("⚠️ The new messages continue the last ingested one: full rebuild")
+            return None
+        tail = [first_line] if first_line is not None else []
+        df_new = DataProcessing.parse_and_clean(itertools.chain(tail, lines), gName, message_filter, export_format, batch_size)
+
+        if last_timestamp and (df_new['date'] < pd.Timestamp(last_timestamp)).any():
+            print("⚠️ The new messages are older than the ingested ones: full rebuild")
+            return None
+        return df_new
+
+    # Build and clean the DataFrame of a single batch of parsed messages
+    # Compact schema:
+    #   date    -> datetime64[s] (WhatsApp timestamps have a one second resolution)
+    #   user    -> categorical (a handful of users repeated over millions of rows)
+    #   message -> Arrow-backed string (no Python object per message)
+    def clean_batch(batch: List[Tuple[str, str, str, str, str]], gName: str, message_filter: MessageFilter, export_format: ExportFormat) -> pd.DataFrame:
         # Build the columns
-        parsed_data = []
-        for match in matches:
-            date = pd.to_datetime(match[0] + ' ' + match[1], format='%d/%m/%y %H:%M:%S')
-            user = match[2].strip()
-            message = match[3].replace('\n', ' ').strip()  # Combine multiline messages
-            
-            parsed_data.append({
-                'date': date,
-                'user': user,
-                'message': message
-            })
+        dates, times, ampms, users, messages = [], [], [], [], []
+        for date, time, ampm, user, message in batch:
+            dates.append(date)
+            times.append(time)
+            ampms.append(ampm)
+            users.append(user.strip())
+            messages.append(message)
 
         # Create DataFrame
-        df = pd.DataFrame(parsed_data)
+        df = pd.DataFrame({
+            'date': DataProcessing.parse_timestamps(dates, times, ampms, export_format.date_format),
+            'user': pd.Categorical(users),
+            'message': pd.array(messages, dtype='string[pyarrow]'),
+        })
 
         # Replacing user names with more appropriate or simplified labels for the graph
         # This ensures that we have consistent and readable names for users in the plot.
-        df['user'] = df['user'].replace({
-            'PippoFranco': 'User1',       # Renaming 'PippoFranco' to 'User1'
-            'PaoloRuffini': 'User2',       # Renaming 'PaoloRuffini' to 'User2'
-            'ElioELeStorieTese' : 'User3',         # ...
-            'Brelusconi' : 'User4', 
-        })
+        df['user'] = DataProcessing.rename_users(df['user'], DataProcessing.USER_ALIASES)
 
         # Filtering out system messages and unwanted lines
-        # The following filters are applied to exclude unwanted content such as system notifications, deleted messages, and links.
-        df_clean = df[
-            (~df['user'].str.contains(gName, na=False)) &                           # Exclude messages from the user with the name 'gName' (group's name) (usually a bot or system)
-            (~df['message'].str.contains('omitted', na=False)) &                    # Exclude messages that contain 'omitted', which usually indicates hidden content
-            (~df['message'].str.contains('@3', na=False)) &
-            (~df['message'].str.contains('You deleted this message', na=False)) &
-            (~df['message'].str.contains('pinned a message', na=False)) &
-            (~df['message'].str.contains('POLL', na=False)) &
-            (~df['message'].str.contains('message was deleted', na=False))&
-            (~df['message'].str.contains('http', na=False))&
-            (~df['message'].str.contains('https', na=False))
-            # add other here
-        ].copy()
-
-        
-        # Replace the unwanted string with an empty space ONLY in messages that contain it
-        # Here, we are searching for the phrase "This message was edited"
-        # and replacing it with a single space. This helps remove notifications about edited messages.
-        df_clean['message'] = df_clean['message'].str.replace(
-            r'\s*<This message was edited>\s*',
-            ' ', 
-            regex=True,
-            case=False,
-            flags=re.IGNORECASE 
-        )
+        # Exclude messages from the user with the name 'gName' (group's name) (usually a bot or system)
+        df = df[~df['user'].str.contains(gName, na=False)]
+        # The rules in config.yaml exclude unwanted content such as system notifications, deleted messages, and links.
+        df_clean = df[message_filter.keep_mask(df['message'])].copy()
+
+        # Replace the unwanted strings (e.g. "<This message was edited>") with an empty space
+        df_clean['message'] = message_filter.strip(df_clean['message'])
+
+        return df_clean
+
+    # Convert the date ("dd/mm/yy[yy]"), time ("hh:mm[:ss]") and AM/PM parts into datetime64[s] in one vectorized pass
+    # Fast path: the fixed-width layout is decoded with integer arithmetic on the raw bytes,
+    # anything unexpected falls back to a single pd.to_datetime call (with date_format) on the whole batch.
+    def parse_timestamps(dates: List[str], times: List[str], ampms: List[str], date_format: str = '%d/%m/%y %H:%M:%S') -> np.ndarray:
+        if not dates:
+            return np.array([], dtype='datetime64[s]')
+        date_width = 10 if '%Y' in date_format else 8
+        time_width = 8 if '%S' in date_format else 5
+        twelve_hour = '%p' in date_format
+        try:
+            date_digits = np.array(dates, dtype=f'S{date_width}').view(np.uint8).reshape(-1, date_width).astype(np.int64) - ord('0')
+            time_digits = np.array(times, dtype=f'S{time_width}').view(np.uint8).reshape(-1, time_width).astype(np.int64) - ord('0')
+        except UnicodeEncodeError:
+            date_digits = time_digits = None
+
+        if date_digits is not None and np.all(date_digits[:, [2, 5]] == ord('/') - ord('0')):
+            day = date_digits[:, 0] * 10 + date_digits[:, 1]
+            month = date_digits[:, 3] * 10 + date_digits[:, 4]
+            year = date_digits[:, 6:].dot(10 ** np.arange(date_width - 7, -1, -1))
+            if date_width == 8:
+                year = np.where(year < 69, 2000 + year, 1900 + year)  # Same pivot as strptime's %y
 
+            # "9:05" is one character shorter than "21:05"
+            short = time_digits[:, 1] == ord(':') - ord('0')
+            t = np.where(short[:, None], np.roll(time_digits, 1, axis=1), time_digits)
+            t[short, 0] = 0
+            if time_width == 5:
+                t = np.concatenate([t, np.zeros((len(t), 3), dtype=np.int64)], axis=1)
+                t[:, 5] = ord(':') - ord('0')
+            hour = t[:, 0] * 10 + t[:, 1]
+            minute = t[:, 3] * 10 + t[:, 4]
+            second = t[:, 6] * 10 + t[:, 7]
 
-        df_clean['date'] = pd.to_datetime(df_clean['date'])
+            hour_valid = (hour < 24)
+            if twelve_hour:
+                hour_valid = (hour >= 1) & (hour <= 12)
+                pm = (np.array(ampms, dtype='S1').view(np.uint8) | 0x20) == ord('p')  # Lowercase first letter
+                hour = hour % 12 + np.where(pm, 12, 0)
 
-        # Save the cleaned data to a CSV file while keeping columns separated
-        df_clean.to_csv(
-            processed_path, 
-            index=False, 
-            encoding='utf-8'
-        )  
+            month_start = ((year - 1970) * 12 + month - 1).astype('datetime64[M]')
+            days_in_month = ((month_start + 1).astype('datetime64[D]') - month_start.astype('datetime64[D]')).astype(np.int64)
+            digits = np.concatenate([date_digits[:, [0, 1, 3, 4]], date_digits[:, 6:], t[:, [0, 1, 3, 4, 6, 7]]], axis=1)
+            valid = (
+                np.all((digits >= 0) & (digits <= 9))
+                and np.all(t[:, [2, 5]] == ord(':') - ord('0'))
+                and np.all((month >= 1) & (month <= 12))
+                and np.all((day >= 1) & (day <= days_in_month))
+                and np.all(hour_valid & (minute < 60) & (second < 60))
+            )
+            if valid:
+                seconds = hour * 3600 + minute * 60 + second
+                return month_start.astype('datetime64[D]').astype('datetime64[s]') + (day - 1) * 86400 + seconds
 
-        return df_clean
\ No newline at end of file
+        # Slow path (still vectorized): let pandas parse the whole batch with the explicit format
+        stamps = pd.Series(dates) + ' ' + pd.Series(times)
+        if twelve_hour:
+            stamps = stamps + ' ' + pd.Series(ampms).str.upper()
+        timestamps = pd.to_datetime(stamps, format=date_format)
+        return timestamps.to_numpy().astype('datetime64[s]')
+
+    # Rename users by renaming the categories: O(unique users) instead of O(messages)
+    # Aliases may merge several names into one label (or into an existing user)
+    def rename_users(users: pd.Series, aliases: dict) -> pd.Series:
+        categories = users.cat.categories
+        renamed = pd.Index([aliases.get(name, name) for name in categories])
+        if renamed.is_unique:
+            return users.cat.rename_categories(renamed)
+
+        # Some names collapse onto the same label: remap the integer codes
+        merged = renamed.unique()
+        code_map = np.append(merged.get_indexer(renamed), -1)  # code -1 (missing) stays missing
+        codes = code_map[users.cat.codes.to_numpy()]
+        return pd.Series(pd.Categorical.from_codes(codes, categories=merged), index=users.index)
+
+    # Memory footprint of the compact schema compared to the plain object-dtype one
+    # (the comparison materializes an object-dtype copy: call it only when you need the report)
+    def memory_report(df: pd.DataFrame) -> pd.DataFrame:
+        compact = df.memory_usage(deep=True, index=False)
+        legacy = df.astype({
+            'date': 'datetime64[ns]',
+            'user': object,
+            'message': object,
+        }).memory_usage(deep=True, index=False)
+
+        report = pd.DataFrame({
+            'object_MB': legacy / 2**20,
+            'compact_MB': compact / 2**20,
+        })
+        report.loc['total'] = report.sum()
+        report['ratio'] = report['object_MB'] / report['compact_MB']
+        print("📦 Memory footprint of the cleaned chat:")
+        print(report.round(2).to_string(), "\n")
+        return report
@@ -0,0 +1,82 @@
+import os
+import re
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from typing import Callable, List
+
+class EmbeddingStore:
+    # On-disk cache of message embeddings, one directory per embedding model:
+    #   <path>/<model>/keys.npy     content hash (16-byte BLAKE2b) of each stored message
+    #   <path>/<model>/vectors.f16  float16 matrix, one row per key (same order), memory-mapped
+    #   <path>/<model>/meta.json    model name and embedding size
+    # Only the messages never seen before are encoded: re-running on a grown chat encodes just the new ones.
+    def __init__(self, path: str, model_name: str):
+        self.model_name = model_name
+        self.path = os.path.join(path, re.sub(r'[^\w.-]+', '_', model_name))
+        self.keys_path = os.path.join(self.path, 'keys.npy')
+        self.vectors_path = os.path.join(self.path, 'vectors.f16')
+        self.meta_path = os.path.join(self.path, 'meta.json')
+
+    @staticmethod
+    def hash_texts(texts: List[str]) -> np.ndarray:
+        return np.array(
+            [hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest() for text in texts],
+            dtype='S16'
+        )
+
+    # Load the stored keys and the memory-mapped vectors (None if the store is empty)
+    def load(self):
+        if not (os.path.exists(self.keys_path) and os.path.exists(self.meta_path)):
+            return np.array([], dtype='S16'), None
+        with open(self.meta_path, encoding='utf-8') as fp:
+            dim = json.load(fp)['dim']
+        keys = np.load(self.keys_path)
+        if not len(keys):
+            return keys, None
+        vectors = np.memmap(self.vectors_path, dtype=np.float16, mode='r', shape=(len(keys), dim))
+        return keys, vectors
+
+    # Append new rows (the keys file is written last: it defines how many rows are valid)
+    def append(self, keys: np.ndarray, new_keys: np.ndarray, new_vectors: np.ndarray) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        with open(self.meta_path, 'w', encoding='utf-8') as fp:
+            json.dump({'model': self.model_name, 'dim': int(new_vectors.shape[1])}, fp)
+        row_bytes = new_vectors.shape[1] * np.dtype(np.float16).itemsize
+        with open(self.vectors_path, 'ab') as fp:
+            if fp.tell() != len(keys) * row_bytes:
+                fp.truncate(len(keys) * row_bytes)  # Drop the rows of an interrupted run
+            fp.write(np.ascontiguousarray(new_vectors, dtype=np.float16).tobytes())
+        np.save(self.keys_path + '.tmp.npy', np.concatenate([keys, new_keys]))
+        os.replace(self.keys_path + '.tmp.npy', self.keys_path)
+
+    # Embeddings (float32) of the given texts, encoding only the ones missing from the store
+    #   encode: function mapping a list of texts to their embedding matrix
+    def get(self, texts: List[str], encode: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        text_keys = EmbeddingStore.hash_texts(texts)
+        keys, vectors = self.load()
+        rows = pd.Index(keys).get_indexer(text_keys) if len(keys) else np.full(len(texts), -1)
+
+        missing = np.flatnonzero(rows < 0)
+        print(f"💾 Embedding cache: {len(texts) - len(missing)} cached, {len(missing)} to encode")
+        new_vectors = None
+        if len(missing):
+            # Encode each missing message once, even if it appears several times
+            missing_keys, first, inverse = np.unique(text_keys[missing], return_index=True, return_inverse=True)
+            # Rounded to float16 like the stored rows: the first run and the later ones see the same embeddings
+            # (and the same bytes, which key the cached UMAP reduction)
+            new_vectors = np.asarray(encode([texts[i] for i in missing[first]]), dtype=np.float16).astype(np.float32)
+            self.append(keys, missing_keys, new_vectors)
+        elif vectors is None:
+            # No texts and nothing stored: only the encoder knows the embedding size
+            return np.asarray(encode([]), dtype=np.float32)
+
+        dim = new_vectors.shape[1] if new_vectors is not None else vectors.shape[1]
+        embeddings = np.empty((len(texts), dim), dtype=np.float32)
+        cached = rows >= 0
+        if cached.any():
+            embeddings[cached] = vectors[rows[cached]]
+        if len(missing):
+            embeddings[missing] = new_vectors[inverse.ravel()]
+        return embeddings
@@ -0,0 +1,81 @@
+import re
+import emoji
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+class EmojiCounter:
+    # Counts whole emojis (ZWJ sequences, flags, skin tones, keycaps...), not their single code points.
+    # Every emoji of emoji.EMOJI_DATA is compiled into one regex shaped like a trie: at each code point the
+    # longer continuations are tried first, so a sequence is always matched as a whole.
+    # Only the distinct "runs" of the chat go through that regex: inside Arrow, every character that is not
+    # part of any emoji becomes a space and the messages are split on whitespace. A chat repeats the same
+    # few runs ("😂😂", "❤️"...), so the regex sees thousands of short strings instead of every message.
+    # Variants with or without the variation selector (U+FE0F) are counted as the fully-qualified emoji.
+    def __init__(self):
+        trie = {}
+        for text in emoji.EMOJI_DATA:
+            node = trie
+            for char in text:
+                node = node.setdefault(char, {})
+            node[''] = True
+        self.pattern = re.compile(EmojiCounter.trie_pattern(trie))
+        # Code points that never appear in an emoji (RE2 syntax)
+        self.separators = '[^' + ''.join(f'\\x{{{ord(char):x}}}' for char in sorted(set(''.join(emoji.EMOJI_DATA)))) + ']+'
+
+        self.canonical = {}
+        for text, data in emoji.EMOJI_DATA.items():
+            base = text.replace('\ufe0f', '')
+            if data['status'] == emoji.STATUS['fully_qualified'] or base not in self.canonical:
+                self.canonical[base] = text
+
+    # Regex of a trie node: single code points are grouped in a character class, the end of an emoji
+    # inside the node makes the continuation optional (greedy: the longest emoji wins)
+    def trie_pattern(node: dict) -> str:
+        leaves = [char for char, child in node.items() if char and list(child) == ['']]
+        branches = [
+            re.escape(char) + EmojiCounter.trie_pattern(child)
+            for char, child in sorted(node.items()) if char and char not in leaves
+        ]
+        if leaves:
+            leaves = sorted(leaves)
+            branches.append(re.escape(leaves[0]) if len(leaves) == 1 else '[' + ''.join(re.escape(char) for char in leaves) + ']')
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            pattern = '(?:' + pattern + ')?'
+        return pattern
+
+    # One row per (user, month, emoji) with its count, from a single pass over the messages
+    def count(self, df: pd.DataFrame) -> pd.DataFrame:
+        messages = pa.array(df['message'], type=pa.string())
+        runs = pc.utf8_split_whitespace(pc.replace_substring_regex(messages, pattern=self.separators, replacement=' '))
+        run_rows = pc.list_parent_indices(runs).to_numpy()
+        run_ids = pc.list_flatten(runs).dictionary_encode()
+
+        # Emojis of each distinct run (canonical form), flattened, with the offset of each run
+        matches = [
+            [self.canonical.get(text.replace('\ufe0f', ''), text) for text in self.pattern.findall(run)]
+            for run in run_ids.dictionary.to_pylist()
+        ]
+        sizes = np.array([len(found) for found in matches], dtype=np.int64)
+        offsets = np.cumsum(sizes) - sizes
+        names = np.array([text for found in matches for text in found], dtype=object)
+
+        # Expand every run of every message into its emojis
+        ids = run_ids.indices.to_numpy()
+        repeats = sizes[ids]
+        rows = np.repeat(run_rows, repeats)
+        within = np.arange(len(rows)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+        emojis = pd.DataFrame({
+            'user': df['user'].array[rows],
+            'month': df['date'].to_numpy()[rows].astype('datetime64[M]'),
+            'emoji': names[np.repeat(offsets[ids], repeats) + within],
+        })
+        return (
+            emojis.groupby(['user', 'month', 'emoji'], observed=True, sort=False)
+            .size()
+            .reset_index(name='count')
+        )
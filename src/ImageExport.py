@@ -0,0 +1,38 @@
+import time
+import threading
+import plotly.io as pio
+
+class ImageExport:
+    # Static images (PNG, SVG...) of the charts of a run, rendered in one batch: the stages queue their figures
+    # and export() hands them all to a single Kaleido renderer (one headless browser for the whole batch,
+    # instead of one start-up per fig.write_image call).
+    #   image_format: 'png', 'svg', 'jpg', 'webp' or 'pdf'
+    #   width, height: size in layout pixels (None = the size set in the figure layout, else 700 x 500)
+    #   scale: resolution multiplier of the raster formats (2 = twice the pixels per side)
+    def __init__(self, image_format: str = 'png', width: int = None, height: int = None, scale: float = 1):
+        self.image_format = image_format
+        self.width = width
+        self.height = height
+        self.scale = scale
+        self.queue = []
+        self.lock = threading.Lock()  # Figures are queued by the stage and figure threads
+
+    # Queue a figure: path without extension, width and height override the default size of this image
+    def add(self, fig, path: str, width: int = None, height: int = None) -> None:
+        with self.lock:
+            self.queue.append((fig, f"{path}.{self.image_format}", width or self.width, height or self.height))
+
+    # Render and write every queued figure
+    def export(self) -> None:
+        with self.lock:
+            queue, self.queue = self.queue, []
+        if not queue:
+            return
+
+        print(f"⏳ Exporting {len(queue)} static images ({self.image_format})...")
+        start = time.perf_counter()
+        figs, files, widths, heights = zip(*queue)
+        pio.write_images(list(figs), list(files), format=self.image_format, scale=self.scale,
+                         width=list(widths), height=list(heights))
+        elapsed = time.perf_counter() - start
+        print(f"✅ {len(files)} images written in {elapsed:.1f}s ({elapsed / len(files):.2f}s per image)\n")
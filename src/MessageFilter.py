@@ -0,0 +1,68 @@
+import re
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from typing import Optional, List
+
+class MessageFilter:
+    # Rules used when config.yaml has no "filters" section
+    DEFAULT_RULES = {
+        'drop_messages': [
+            'omitted',
+            '@3',
+            'You deleted this message',
+            'pinned a message',
+            'POLL',
+            'message was deleted',
+            'http',
+        ],
+        'strip_messages': [
+            r'\s*<This message was edited>\s*',
+        ],
+    }
+
+    # drop_messages: messages containing any of these strings are removed
+    # strip_messages: regular expressions removed from the kept messages (case-insensitive)
+    # All the drop rules are compiled into a single alternation, matched in one pass over the
+    # messages (inside Arrow/RE2): each dropped message is counted for the leftmost rule it matches.
+    def __init__(self, drop_messages: List[str], strip_messages: List[str]):
+        self.drop_messages = list(drop_messages)
+        self.strip_messages = list(strip_messages)
+        self.drop_pattern = (
+            '(?P<rule>' + '|'.join(re.escape(rule) for rule in self.drop_messages) + ')'
+            if self.drop_messages else None
+        )
+        self.strip_pattern = (
+            '(?i)(?:' + '|'.join(self.strip_messages) + ')'
+            if self.strip_messages else None
+        )
+        self.hits = dict.fromkeys(self.drop_messages, 0)
+
+    def from_config(filters: Optional[dict]) -> 'MessageFilter':
+        rules = {**MessageFilter.DEFAULT_RULES, **(filters or {})}
+        return MessageFilter(rules['drop_messages'] or [], rules['strip_messages'] or [])
+
+    # Boolean mask of the messages to keep (and update the per-rule hit counts)
+    def keep_mask(self, messages: pd.Series) -> np.ndarray:
+        if self.drop_pattern is None or messages.empty:
+            return np.ones(len(messages), dtype=bool)
+        matched = pc.struct_field(
+            pc.extract_regex(pa.array(messages, type=pa.string()), self.drop_pattern),
+            [0]
+        )
+        counts = pc.value_counts(pc.drop_null(matched))
+        for rule, count in zip(counts.field('values').to_pylist(), counts.field('counts').to_pylist()):
+            self.hits[rule] += count
+        return pc.is_null(matched).to_numpy(zero_copy_only=False)
+
+    # Replace the unwanted strings with a single space
+    def strip(self, messages: pd.Series) -> pd.Series:
+        if self.strip_pattern is None:
+            return messages
+        return messages.str.replace(self.strip_pattern, ' ', regex=True)
+
+    def report(self) -> None:
+        print("🧹 Messages removed by each filter rule:")
+        for rule, count in self.hits.items():
+            print(f"   {rule!r}: {count}")
@@ -0,0 +1,45 @@
+import os
+import json
+import hashlib
+import joblib
+import numpy as np
+from typing import Optional, Tuple
+
+class ReductionCache:
+    # On-disk cache of the last dimensionality reduction (UMAP) of the embeddings:
+    #   <path>/reduced.npy   reduced embeddings (float32), one row per message
+    #   <path>/umap.joblib   fitted reduction model (needed by transform and the visualizations)
+    #   <path>/meta.json     key of the cached reduction (hash of the embeddings and of the model parameters)
+    # Re-fitting with other clustering settings skips the reduction, the slowest step after the embeddings.
+    def __init__(self, path: str):
+        self.path = path
+        self.reduced_path = os.path.join(path, 'reduced.npy')
+        self.model_path = os.path.join(path, 'umap.joblib')
+        self.meta_path = os.path.join(path, 'meta.json')
+
+    @staticmethod
+    def key(embeddings: np.ndarray, umap_model) -> str:
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(repr(sorted(umap_model.get_params().items())).encode('utf-8'))
+        hasher.update(str(embeddings.shape).encode('utf-8'))
+        hasher.update(np.ascontiguousarray(embeddings, dtype=np.float32).tobytes())
+        return hasher.hexdigest()
+
+    # The fitted model and the reduced embeddings cached under this key, else None
+    def load(self, key: str) -> Optional[Tuple[object, np.ndarray]]:
+        if not os.path.exists(self.meta_path):
+            return None
+        with open(self.meta_path, encoding='utf-8') as fp:
+            if json.load(fp)['key'] != key:
+                return None
+        return joblib.load(self.model_path), np.load(self.reduced_path)
+
+    # Only the last reduction is kept (the fitted model can take hundreds of MB on a large chat)
+    def save(self, key: str, umap_model, reduced: np.ndarray) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        if os.path.exists(self.meta_path):
+            os.remove(self.meta_path)  # Invalidate first: an interrupted save never pairs old and new files
+        joblib.dump(umap_model, self.model_path)
+        np.save(self.reduced_path, np.asarray(reduced, dtype=np.float32))
+        with open(self.meta_path, 'w', encoding='utf-8') as fp:
+            json.dump({'key': key, 'shape': list(reduced.shape)}, fp)
@@ -1,28 +1,38 @@
 import spacy
-from typing import Set, Tuple, List
+from typing import Set, Tuple, List, Optional
 
 class SpacyNLP:     
+    # Nothing is loaded here: the stopwords come from the spaCy language class (no model, no download)
+    # and the full pipeline is only loaded the first time self.nlp is used
     def __init__(self, language: str):
         self.language = language
-        # Load the spaCy model based on the specified language
-        print("⏳ Loading the NLP model (spaCy)...\n")
-        try:
-            # nlp = en_core_web_md.load()  web, I believe it doesn't download
-            self.nlp = spacy.load(f"{language}_core_news_sm")
-        except OSError:
-            print(f"⏳ Downloading spaCy model for {language}...")
-            from spacy.cli import download
-            download(f"{language}_core_news_sm")
-            self.nlp = spacy.load(f"{language}_core_news_sm")
+        self._nlp = None
+        self.stopwords: Optional[Set[str]] = None
 
-        self.stopwords = self.get_stopwords()
+    # Load the spaCy model based on the specified language (downloaded if missing: needs network access)
+    @property
+    def nlp(self):
+        if self._nlp is None:
+            print("⏳ Loading the NLP model (spaCy)...\n")
+            try:
+                # nlp = en_core_web_md.load()  web, I believe it doesn't download
+                self._nlp = spacy.load(f"{self.language}_core_news_sm")
+            except OSError:
+                print(f"⏳ Downloading spaCy model for {self.language}...")
+                from spacy.cli import download
+                download(f"{self.language}_core_news_sm")
+                self._nlp = spacy.load(f"{self.language}_core_news_sm")
+        return self._nlp
 
     # Stopwords: 
     #   you have the option to customize them for more effective filtering in specific cases
+    #   computed once, then memoized
     def get_stopwords(self) -> Set[str]:
-        # Get spaCy stopwords
+        if self.stopwords is not None:
+            return self.stopwords
+        # Get spaCy stopwords (language defaults: the same set the "_core_news_sm" pipelines use)
         print("⏳ Retrieval of stopwords...")
-        nlp_stopwords = self.nlp.Defaults.stop_words
+        nlp_stopwords = spacy.util.get_lang_class(self.language).Defaults.stop_words
         other_stopwords  = {
             'ahah', 'ahahah', 'ahahaha', 'ahahahah', 'ahahahahah',
             'this', 'message', 'was', 'deleted', 'omitted',
@@ -34,6 +44,6 @@ class SpacyNLP:
             *[str(i) for i in range(100)],
             *'abcdefghijklmnopqrstuvwxyz'
         }
-        stopwords = nlp_stopwords | other_stopwords
+        self.stopwords = nlp_stopwords | other_stopwords
 
-        return stopwords
\ No newline at end of file
+        return self.stopwords
\ No newline at end of file
@@ -0,0 +1,57 @@
+import time
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer
+from typing import Dict, List, Optional
+
+class TokenCounts:
+    # The chat tokenized once: a sparse document-term count matrix (one row per message, one column per n-gram),
+    # shared by the word cloud (unigram frequencies) and by the topic model (c-TF-IDF of each topic).
+    def __init__(self, vectorizer: CountVectorizer, messages: pd.Series):
+        print("⏳ Tokenizing the messages...")
+        start = time.perf_counter()
+        self.vectorizer = vectorizer
+        self.matrix = vectorizer.fit_transform(messages.fillna('').astype(object)).tocsr()
+        self.terms = vectorizer.get_feature_names_out()
+        print(f"✅ {self.matrix.shape[0]} messages, {self.matrix.shape[1]} terms, "
+              f"{self.matrix.nnz} non-zero counts in {time.perf_counter() - start:.1f}s\n")
+
+    # Initialize the Vectorizer Model.
+    # Unlike simple stopword removal, this model also constructs n-grams and filters terms based on frequency,
+    # providing a more robust feature extraction process.
+    def new_vectorizer(stopwords: List[str]) -> CountVectorizer:
+        return CountVectorizer(
+            stop_words=stopwords,
+            ngram_range=(1, 3),  # Considers unigrams, bigrams, and trigrams
+            min_df=2,            # Excludes terms that appear too rarely
+            max_df=0.95,         # Excludes terms that appear too frequently
+        )
+
+    # Single words only, without the frequency pruning: the word counts of the word cloud when there is no shared table
+    def new_word_vectorizer(stopwords: List[str]) -> CountVectorizer:
+        return CountVectorizer(stop_words=stopwords)
+
+    # The shared table of the messages, None when the frequency pruning leaves no terms (e.g. a chat of a few messages)
+    def shared(messages: pd.Series, stopwords: List[str]) -> Optional['TokenCounts']:
+        try:
+            return TokenCounts(TokenCounts.new_vectorizer(stopwords), messages)
+        except ValueError as e:
+            print(f"⚠️ No shared token table ({e}): the word cloud counts single words on its own\n")
+            return None
+
+    # Total count of every single word (n-grams excluded) over the whole chat
+    def word_frequencies(self) -> Dict[str, int]:
+        unigrams = np.flatnonzero(np.char.find(self.terms.astype(str), ' ') < 0)
+        counts = np.asarray(self.matrix[:, unigrams].sum(axis=0)).ravel()
+        return dict(zip(self.terms[unigrams].tolist(), counts.tolist()))
+
+    # Count matrix of groups of messages (one row per group): the sum of the rows of their messages
+    #   groups: group index (0..n_groups-1) of every message, -1 to leave a message out
+    def group_counts(self, groups: np.ndarray, n_groups: int) -> sparse.csr_matrix:
+        keep = groups >= 0
+        indicator = sparse.csr_matrix(
+            (np.ones(keep.sum(), dtype=self.matrix.dtype), (groups[keep], np.flatnonzero(keep))),
+            shape=(n_groups, self.matrix.shape[0])
+        )
+        return (indicator @ self.matrix).tocsr()
@@ -1,9 +1,11 @@
 from bertopic import BERTopic
 from sentence_transformers import SentenceTransformer
-from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.base import clone
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import IncrementalPCA
+from bertopic.vectorizers import OnlineCountVectorizer
+from sklearn.metrics import adjusted_rand_score, normalized_mutual_info_score
 from hdbscan import HDBSCAN
-import openai
-from bertopic.representation import OpenAI
 from bertopic.representation import KeyBERTInspired
 import plotly.express as px
 from plotly.express import pie
@@ -11,52 +13,76 @@ import plotly.graph_objects as go
 from textwrap import wrap
 import pandas as pd
 from typing import Optional, List
+import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
 import re
 import os
+import json
+import shutil
+import time
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import partial
+from src.EmbeddingStore import EmbeddingStore
+from src.ReductionCache import ReductionCache
+from src.AsyncOpenAIRepresentation import AsyncOpenAIRepresentation
+from src.TokenCounts import TokenCounts
+from src.PlotlyAsset import PlotlyAsset
 
 class TopicModeling:
-    def __init__(self, language, stopwords, api_key_openai, outputs_path_TM):
+    EMBEDDING_MODEL = 'paraphrase-multilingual-MiniLM-L12-v2'
+    # BERTopic steps timed while fitting, with the name of their phase
+    PHASES = {
+        '_reduce_dimensionality': 'reduce',
+        '_cluster_embeddings': 'cluster',
+        '_c_tf_idf': 'c-TF-IDF',
+        '_extract_words_per_topic': 'represent',
+        '_reduce_topics': 'topic reduction',
+    }
+
+    # The settings after outputs_path_TM are keyword-only (there are too many of them to pass by position):
+    # embedding_cache_path: directory of the on-disk embedding cache (None to always encode every message)
+    # encode_batch_size: messages per forward pass of the embedding model
+    # encode_workers: processes used to encode the messages (1 = encode in this process)
+    # sample_size: fit on a stratified sample (by month and user) of this many messages and assign
+    #              the others with transform, in batches of assign_batch_size (0 = fit on every message)
+    # online_path: directory of the persisted online model (None = retrain from scratch on every run)
+    # online_topics: number of topics of the online model
+    # online_batch_size: messages per partial_fit call of the online model
+    # nr_topics: topic reduction applied while fitting ("auto", a maximum number of topics, or None to keep them all)
+    # defer_representation: run the representation model only on the reduced topics, not on the ones before the merge
+    # reduction_cache_path: directory of the cached UMAP reduction (None to always run UMAP)
+    # openai_settings: model, base_url, requests_per_minute, max_concurrency and label_cache of the OpenAI labelling
+    # token_counts: document-term table of the same messages (TokenCounts), reused instead of tokenizing them again
+    # plotly_js_path: directory of the plotly.js bundle shared by the chart pages (None = outputs_path_TM)
+    # image_export: batch export of the static images of the run (ImageExport), None for the HTML pages only
+    def __init__(self, language, stopwords, api_key_openai, outputs_path_TM, *, embedding_cache_path=None, encode_batch_size=64,
+                 encode_workers=1, sample_size=0, assign_batch_size=50_000, online_path=None, online_topics=50, online_batch_size=10_000,
+                 nr_topics="auto", defer_representation=True, reduction_cache_path=None, openai_settings=None, token_counts=None,
+                 plotly_js_path=None, image_export=None):
 
         # Initialize the BERTopic analyzer
         print("⏳ Initialize the BERTopic analyzer (for Topic Modeling)...")
         
         self.outputs_path_TM = outputs_path_TM
-        # If you want to use a representation model with ChatGPT:
-        # Configure OpenAI-compatible client and testing API 
-        self.openai_client = None
-        if api_key_openai:
-            try:
-                # Initialize the client with a global timeout
-                self.openai_client = openai.OpenAI(
-                    api_key=api_key_openai,
-                    timeout=30.0,  # Global timeout for all requests
-                    max_retries=3  # Maximum number of retry attempts
-                )
-                # Connection test with updated parameters
-                test_response = self.openai_client.chat.completions.create(
-                    messages=[{"role": "user", "content": "Connectivity test"}],
-                    model="gpt-3.5-turbo",
-                    timeout=15  # Correct parameter for v1.x (request_timeout is deprecated)
-                )
-                print(f"✅ API test successful. Tokens used: {test_response.usage.total_tokens}")
-
-            except openai.APIConnectionError as e:
-                print("❌ Permanent connection error. Possible reasons:")
-                print("- Unstable internet connection")
-                print("- Firewall/proxy blocking")
-                print("- Incorrect DNS configuration")
-                raise e
-            except Exception as e:
-                print(f"❌ Error during OpenAI initialization: {str(e)}")
-                self.openai_client = None
-
-        # Configure representation model (with ChatGPT or KeyBERT)
-        if self.openai_client:
-            self.representation_model = OpenAI(
-                client=self.openai_client,
-                model="gpt-3.5-turbo-0125",     # Specific model for consistency
-                delay_in_seconds=20,            # Increases the delay between requests
-                chat=True
+        self.plotly_js = PlotlyAsset(plotly_js_path or outputs_path_TM)
+        self.image_export = image_export
+        self.topics_over_time = None
+        # If you want to use a representation model with ChatGPT (or any OpenAI-compatible endpoint):
+        # the topics are labelled concurrently, behind a rate limiter, and the labels are cached on disk.
+        # No connectivity test: it cost a paid completion on every run (a failed request falls back to the keywords)
+        openai_settings = openai_settings or {}
+        if api_key_openai or openai_settings.get('base_url'):
+            self.representation_model = AsyncOpenAIRepresentation(
+                api_key=api_key_openai,
+                model=openai_settings.get('model', "gpt-3.5-turbo-0125"),     # Specific model for consistency
+                base_url=openai_settings.get('base_url'),
+                requests_per_minute=openai_settings.get('requests_per_minute', 60),
+                max_concurrency=openai_settings.get('max_concurrency', 8),
+                label_cache_path=openai_settings.get('label_cache'),
             )
         else:
             # If API key is not present, use the Keybert model
@@ -66,7 +92,21 @@ class TopicModeling:
 
         # Initialize the embedding model, using a SentenceTransformer model ('paraphrase-multilingual-MiniLM-L12-v2')
         # Trained on 50 different languages, a good balance between speed and accuracy...
-        self.embedding_model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
+        self.embedding_model = SentenceTransformer(self.EMBEDDING_MODEL)
+        # Embeddings already computed in previous runs are reused (keyed by message content and model)
+        self.embedding_store = EmbeddingStore(embedding_cache_path, self.EMBEDDING_MODEL) if embedding_cache_path else None
+        self.encode_batch_size = encode_batch_size
+        self.encode_workers = encode_workers
+        self.sample_size = sample_size
+        self.assign_batch_size = assign_batch_size
+        self.language = language
+        self.online_path = online_path
+        self.online_topics = online_topics
+        self.online_batch_size = online_batch_size
+        self.nr_topics = nr_topics
+        self.defer_representation = defer_representation
+        # The UMAP reduction of the same embeddings is reused, e.g. while tuning HDBSCAN
+        self.reduction_cache = ReductionCache(reduction_cache_path) if reduction_cache_path else None
 
 
         # Initialize HDBSCAN for Clustering
@@ -74,17 +114,13 @@ class TopicModeling:
             min_cluster_size=17,            # Groups of at least 17 messages
             min_samples=3,                  # Reduces sensitivity to noise
             cluster_selection_epsilon=0.3,  # Merges nearby clusters
+            prediction_data=bool(sample_size),  # Needed to assign the messages left out of the sample
         )
 
-        # Initialize the Vectorizer Model.
-        # Unlike simple stopword removal, this model also constructs n-grams and filters terms based on frequency,
-        # providing a more robust feature extraction process.
-        self.vectorizer_model = CountVectorizer(
-            stop_words=stopwords,
-            ngram_range=(1, 3),  # Considers unigrams, bigrams, and trigrams
-            min_df=2,            # Excludes terms that appear too rarely
-            max_df=0.95,         # Excludes terms that appear too frequently
-        )
+        # Initialize the Vectorizer Model (see TokenCounts.new_vectorizer)
+        # With the shared token table, its vectorizer (already fitted on the messages) is reused
+        self.token_counts = token_counts
+        self.vectorizer_model = token_counts.vectorizer if token_counts is not None else TokenCounts.new_vectorizer(stopwords)
             
 
         # Initialize BERTopic
@@ -94,11 +130,41 @@ class TopicModeling:
             language=language,
             vectorizer_model = self.vectorizer_model,
             representation_model = self.representation_model,
-            nr_topics = "auto",
+            nr_topics = nr_topics,
             verbose=True
         )
 
+        # Online mode: every component can be updated with partial_fit, and no topic reduction is applied,
+        # so a topic keeps its ID from one run to the next
+        if online_path:
+            self.topic_model = BERTopic(
+                embedding_model = self.embedding_model,
+                umap_model = IncrementalPCA(n_components=5),
+                hdbscan_model = MiniBatchKMeans(n_clusters=online_topics, random_state=42),
+                language = language,
+                vectorizer_model = OnlineCountVectorizer(
+                    stop_words=stopwords,
+                    ngram_range=(1, 3),
+                    decay=0.01,          # Older words slowly fade out of the topic representations
+                    delete_min_df=2,     # Keeps the vocabulary from growing without bound
+                ),
+                representation_model = self.representation_model,
+                verbose=True
+            )
+
         print("✅ BERTopic Analyzer successfully initialized")
+
+    # A fresh, unfitted BERTopic model with the same settings (used to benchmark the sampled fit)
+    # The representation model is left out: it does not change which topic each message gets
+    def new_topic_model(self):
+        return BERTopic(
+            embedding_model = self.embedding_model,
+            hdbscan_model = clone(self.hdbscan_model),
+            language = self.language,
+            vectorizer_model = clone(self.vectorizer_model),
+            nr_topics = self.nr_topics,
+            verbose=False
+        )
     
     # Train and transform the BERTopic model on the provided dataframe
     def fit_transform(self, df, text_column='message'):
@@ -106,13 +172,424 @@ class TopicModeling:
         print("⏳ Training BERTopic model...")
         self.documents = df[text_column].fillna('')
         self.timestamps = df['date'].tolist()
-        topics, probs = self.topic_model.fit_transform(self.documents)
-        
-        # Reduce the number of topics based on the documents
-        self.topic_model.reduce_topics(self.documents)
+        self.topics_over_time = None
+        # The topics are reduced inside BERTopic's fit (nr_topics): no second reduction pass afterwards
+        # (instrument last: it times the cached/shared steps too)
+        with self.shared_counts(self.topic_model), self.cached_reduction(self.topic_model), \
+                self.instrument(self.topic_model, self.defer_representation):
+            self.embeddings = self.timed('embed', self.embed, self.documents.tolist())
+            topics, probs = self.fit_topics(self.topic_model, df, self.documents, self.embeddings, self.sample_size)
         
         return topics, probs
 
+    # Time each BERTopic phase while fitting (exclusive time: a phase nested in another one is not counted twice)
+    # defer_representation: with nr_topics set, BERTopic represents the topics, merges them, then represents
+    #   the merged ones again: the representation model (KeyBERT, or paid OpenAI calls) only runs the second time
+    @contextmanager
+    def instrument(self, topic_model, defer_representation=False):
+        self.timings = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.stack = []
+        for name, phase in self.PHASES.items():
+            setattr(topic_model, name, partial(self.timed, phase, getattr(topic_model, name)))
+
+        representation_model = topic_model.representation_model
+        if defer_representation and topic_model.nr_topics and representation_model is not None:
+            reduce_topics = topic_model._reduce_topics
+
+            def reduce_then_represent(documents, *args, **kwargs):
+                topic_model.representation_model = representation_model
+                represented = self.calls['represent']
+                documents = reduce_topics(documents, *args, **kwargs)
+                # Nothing was merged, so BERTopic did not represent the topics again
+                # Without the message embeddings _extract_topics would also replace the topic embeddings (mean of
+                # the embeddings of their messages, still valid) with embeddings of their keywords: they are kept
+                if self.calls['represent'] == represented:
+                    topic_embeddings = topic_model.topic_embeddings_
+                    topic_model._extract_topics(documents)
+                    topic_model.topic_embeddings_ = topic_embeddings
+                return documents
+
+            topic_model.representation_model = None
+            topic_model._reduce_topics = reduce_then_represent
+        try:
+            yield
+        finally:
+            topic_model.representation_model = representation_model
+            for name in self.PHASES:
+                topic_model.__dict__.pop(name, None)
+            self.report_timings()
+
+    # Reuse the cached UMAP reduction (and fitted UMAP model) when the embeddings and UMAP settings are unchanged
+    @contextmanager
+    def cached_reduction(self, topic_model):
+        if self.reduction_cache is None:
+            yield
+            return
+        previous = topic_model.__dict__.get('_reduce_dimensionality')
+        reduce_dimensionality = topic_model._reduce_dimensionality
+
+        def load_or_reduce(embeddings, *args, **kwargs):
+            key = ReductionCache.key(embeddings, topic_model.umap_model)
+            cached = self.reduction_cache.load(key)
+            if cached is not None:
+                print("♻️ Reduced embeddings loaded from the cache")
+                topic_model.umap_model, reduced = cached
+                return reduced
+            reduced = reduce_dimensionality(embeddings, *args, **kwargs)
+            self.reduction_cache.save(key, topic_model.umap_model, reduced)
+            return reduced
+
+        topic_model._reduce_dimensionality = load_or_reduce
+        try:
+            yield
+        finally:
+            if previous is None:
+                topic_model.__dict__.pop('_reduce_dimensionality', None)
+            else:
+                topic_model._reduce_dimensionality = previous
+
+    # c-TF-IDF from the shared token table: the counts of a topic are the sum of the rows of its messages,
+    # instead of joining its messages and tokenizing them again. BERTopic's own path is used whenever the
+    # table does not match the model (sampled fit, online model...); the shared vectorizer is never refitted.
+    @contextmanager
+    def shared_counts(self, topic_model):
+        if self.token_counts is None:
+            yield
+            return
+        previous = topic_model.__dict__.get('_c_tf_idf')
+        c_tf_idf = topic_model._c_tf_idf
+
+        def from_token_counts(documents_per_topic, fit=True, partial_fit=False):
+            topics = np.asarray(topic_model.topics_ if topic_model.topics_ is not None else [])
+            shared = (
+                fit and not partial_fit
+                and topic_model.vectorizer_model is self.token_counts.vectorizer
+                and len(topics) == self.token_counts.matrix.shape[0]
+                and set(documents_per_topic.Topic) == set(topics)
+            )
+            if not shared:
+                if fit and topic_model.vectorizer_model is self.token_counts.vectorizer:
+                    topic_model.vectorizer_model = clone(self.token_counts.vectorizer)
+                return c_tf_idf(documents_per_topic, fit=fit, partial_fit=partial_fit)
+
+            groups = pd.Index(documents_per_topic.Topic).get_indexer(topics)
+            X = self.token_counts.group_counts(groups, len(documents_per_topic))
+            topic_model.ctfidf_model = topic_model.ctfidf_model.fit(X)
+            return topic_model.ctfidf_model.transform(X), self.token_counts.terms
+
+        topic_model._c_tf_idf = from_token_counts
+        try:
+            yield
+        finally:
+            if previous is None:
+                topic_model.__dict__.pop('_c_tf_idf', None)
+            else:
+                topic_model._c_tf_idf = previous
+
+    # Cluster the (cached) reduced embeddings with every combination of HDBSCAN parameters, in parallel
+    #   grid: parameter name -> list of values, e.g. {'min_cluster_size': [10, 17, 25], 'min_samples': [1, 3]}
+    # The topic counts are the clusters found by HDBSCAN, before the topic reduction (nr_topics).
+    def sweep_hdbscan(self, df, grid, workers, text_column='message'):
+        print("⏳ HDBSCAN parameter sweep...")
+        embeddings = self.embed(df[text_column].fillna('').tolist())
+        with self.cached_reduction(self.topic_model):
+            reduced = self.topic_model._reduce_dimensionality(embeddings)
+
+        settings = [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = list(pool.map(TopicModeling.run_hdbscan, itertools.repeat(reduced), settings))
+
+        sweep = pd.DataFrame(rows).sort_values(['outlier_ratio', 'topics'], ignore_index=True)
+        print(sweep.to_string(index=False))
+        if self.outputs_path_TM:
+            os.makedirs(self.outputs_path_TM, exist_ok=True)
+            sweep.to_csv(os.path.join(self.outputs_path_TM, "hdbscan_sweep.csv"), index=False)
+        return sweep
+
+    # Runs in a worker process: one HDBSCAN setting of the sweep
+    def run_hdbscan(reduced, params):
+        start = time.perf_counter()
+        labels = HDBSCAN(**params, core_dist_n_jobs=1).fit_predict(reduced)  # One core per worker
+        return {
+            **params,
+            'topics': len(set(labels) - {-1}),
+            'outlier_ratio': round(float(np.mean(labels == -1)), 3),
+            'seconds': round(time.perf_counter() - start, 1),
+        }
+
+    def timed(self, phase, function, *args, **kwargs):
+        self.calls[phase] += 1
+        self.stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[phase] += elapsed - self.stack.pop()
+            if self.stack:
+                self.stack[-1] += elapsed
+
+    def report_timings(self):
+        print("⏱️ Topic modeling phases:")
+        for phase, seconds in sorted(self.timings.items(), key=lambda item: -item[1]):
+            print(f"   {phase}: {seconds:.1f}s ({self.calls[phase]} calls)")
+
+    # Online mode: update the persisted model with the messages added since the last run
+    # The chat is append-only (new exports only add messages at the end), so the messages already
+    # seen are the first ones: their topics are stored alongside the model and only the new ones are fitted.
+    def partial_fit(self, df, text_column='message'):
+        print("⏳ Updating the online BERTopic model...")
+        self.documents = df[text_column].fillna('')
+        self.timestamps = df['date'].tolist()
+        self.topics_over_time = None
+        topics = self.load_online_model(df)
+        seen = len(topics)
+
+        n_new = len(df) - seen
+        # The first update must give every cluster a message, later ones must fill the PCA components
+        min_messages = self.online_topics if not seen else self.topic_model.umap_model.n_components
+        if n_new < min_messages:
+            if not seen:
+                raise ValueError(f"At least {min_messages} messages are needed to fit the online topic model")
+            print(f"⚠️ Only {n_new} new messages: the online model is not updated")
+        else:
+            print(f"🆕 {n_new} new messages since the last update ({seen} already modeled)")
+            new_topics = []
+            with self.instrument(self.topic_model):
+                embeddings = self.timed('embed', self.embed, self.documents.iloc[seen:].tolist())
+                chunks = np.array_split(np.arange(n_new), max(1, n_new // self.online_batch_size))
+                # Every partial_fit represents the topics again: only the last one runs the representation model
+                # (KeyBERT, or paid OpenAI calls), the labels of the earlier chunks would be replaced anyway
+                representation_model = self.topic_model.representation_model
+                # float64: IncrementalPCA returns float64 after its first batch, and MiniBatchKMeans only updates
+                # with the dtype of its first batch (float32 would fail from the second update on)
+                try:
+                    for i, chunk in enumerate(chunks):
+                        self.topic_model.representation_model = representation_model if i == len(chunks) - 1 else None
+                        self.topic_model.partial_fit(self.documents.iloc[seen + chunk].tolist(), embeddings[chunk].astype(np.float64))
+                        new_topics.append(np.asarray(self.topic_model.topics_, dtype=np.int32))
+                finally:
+                    self.topic_model.representation_model = representation_model
+            topics = np.concatenate([topics, *new_topics])
+            self.save_online_model(topics, df['date'].iloc[-1])
+
+        # Topics of the whole chat (partial_fit only keeps the ones of its last batch)
+        self.topic_model._update_topic_size(pd.DataFrame({'Topic': topics}))
+        return topics.tolist()
+
+    # Load the persisted online model and the topics of the messages it has seen
+    # (an empty array if there is no model yet, or if the chat no longer matches it)
+    def load_online_model(self, df):
+        model_path = os.path.join(self.online_path, 'model.pkl')
+        state_path = os.path.join(self.online_path, 'state.json')
+        if not os.path.exists(model_path):
+            return np.array([], dtype=np.int32)
+        with open(state_path, encoding='utf-8') as fp:
+            state = json.load(fp)
+        topics = np.load(os.path.join(self.online_path, 'topics.npy'))
+        seen = len(topics)
+        if seen > len(df) or df['date'].iloc[seen - 1] != pd.Timestamp(state['last_timestamp']):
+            print("⚠️ The chat no longer matches the online model: retraining from scratch")
+            return np.array([], dtype=np.int32)
+
+        topic_model = BERTopic.load(model_path, embedding_model=self.embedding_model)
+        topic_model.representation_model = self.representation_model
+        # A model saved after a single float32 update: its clusters are updated in float64 from now on
+        clusters = topic_model.hdbscan_model
+        for name in ('cluster_centers_', '_counts'):
+            if getattr(clusters, name, None) is not None:
+                setattr(clusters, name, getattr(clusters, name).astype(np.float64))
+        self.topic_model = topic_model
+        print(f"📂 Online model loaded ({seen} messages, last one on {state['last_timestamp']})")
+        return topics
+
+    def save_online_model(self, topics, last_timestamp):
+        os.makedirs(self.online_path, exist_ok=True)
+        model_path = os.path.join(self.online_path, 'model.pkl')
+        # The representation model is not saved (it holds the API key): it is set again on load
+        representation_model = self.topic_model.representation_model
+        self.topic_model.representation_model = None
+        try:
+            self.topic_model.save(model_path + '.tmp', serialization='pickle', save_embedding_model=False)
+        finally:
+            self.topic_model.representation_model = representation_model
+        os.replace(model_path + '.tmp', model_path)
+        np.save(os.path.join(self.online_path, 'topics.npy'), topics)
+        with open(os.path.join(self.online_path, 'state.json'), 'w', encoding='utf-8') as fp:
+            json.dump({'last_timestamp': pd.Timestamp(last_timestamp).isoformat(), 'messages': len(topics)}, fp, indent=2)
+
+    # Fit the topic model, on every message or on a stratified sample of sample_size messages
+    # With a sample, UMAP and HDBSCAN only see the sample: the other messages are assigned to the
+    # fitted topics with transform, assign_batch_size messages at a time, then the topic sizes are
+    # recomputed over the whole chat.
+    def fit_topics(self, topic_model, df, documents, embeddings, sample_size):
+        if not sample_size or len(documents) <= sample_size:
+            return topic_model.fit_transform(documents, embeddings)
+
+        start = time.perf_counter()
+        sample = self.stratified_sample(df, sample_size)
+        sample_topics, sample_probs = topic_model.fit_transform(documents.iloc[sample].tolist(), embeddings[sample])
+        print(f"🎯 Fitted on a stratified sample of {len(sample)} messages in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        topics = np.empty(len(documents), dtype=int)
+        probs = np.zeros(len(documents))
+        topics[sample] = sample_topics
+        probs[sample] = sample_probs
+        rest = np.setdiff1d(np.arange(len(documents)), sample)
+        for i in range(0, len(rest), self.assign_batch_size):
+            batch = rest[i:i + self.assign_batch_size]
+            topics[batch], probs[batch] = topic_model.transform(documents.iloc[batch].tolist(), embeddings[batch])
+        print(f"🎯 Assigned the other {len(rest)} messages in {time.perf_counter() - start:.1f}s")
+
+        topic_model._update_topic_size(pd.DataFrame({'Topic': topics}))
+        return topics.tolist(), probs
+
+    # Positions of a random sample of about sample_size messages, with the same share of every (month, user) pair
+    def stratified_sample(self, df, sample_size, seed=42):
+        months = df['date'].to_numpy().astype('datetime64[M]')
+        users = pd.factorize(df['user'])[0]
+        positions = pd.Series(np.arange(len(df)))
+        sample = positions.groupby([months, users]).sample(frac=sample_size / len(df), random_state=seed)
+        return np.sort(sample.to_numpy())
+
+    # Compare the sampled fit with a full fit on the same messages: runtime and agreement of the topics
+    # (adjusted Rand index and normalized mutual information between the two assignments)
+    def benchmark_sampling(self, df, text_column='message'):
+        print("⏳ Benchmarking the sampled fit against the full fit...")
+        documents = df[text_column].fillna('')
+        embeddings = self.embed(documents.tolist())
+        rows, assignments = [], {}
+        for mode, sample_size in (('full', 0), ('sampled', self.sample_size)):
+            start = time.perf_counter()
+            topics, _ = self.fit_topics(self.new_topic_model(), df, documents, embeddings, sample_size)
+            topics = np.asarray(topics)
+            assignments[mode] = topics
+            rows.append({
+                'mode': mode,
+                'sample_size': sample_size or len(documents),
+                'seconds': round(time.perf_counter() - start, 1),
+                'topics': len(set(topics) - {-1}),
+                'outlier_ratio': round(float(np.mean(topics == -1)), 3),
+            })
+        benchmark = pd.DataFrame(rows)
+        benchmark['adjusted_rand'] = round(adjusted_rand_score(assignments['full'], assignments['sampled']), 3)
+        benchmark['nmi'] = round(normalized_mutual_info_score(assignments['full'], assignments['sampled']), 3)
+        print(benchmark.to_string(index=False))
+        if self.outputs_path_TM:
+            os.makedirs(self.outputs_path_TM, exist_ok=True)
+            benchmark.to_csv(os.path.join(self.outputs_path_TM, "sampling_benchmark.csv"), index=False)
+        return benchmark
+
+    # Compute the embeddings of the documents
+    # Group chats repeat the same short messages ("ok", "ahah", a single emoji...): each distinct
+    # (whitespace-normalized) message is embedded once, through the cache if enabled,
+    # and its vector is copied back to every row where it appears.
+    def embed(self, documents):
+        normalized = pd.Series(documents, dtype=object).str.split().str.join(' ')
+        codes, uniques = pd.factorize(normalized)
+        uniques = uniques.tolist()
+        print(f"🧬 {len(documents)} messages, {len(uniques)} distinct "
+              f"(dedup ratio: {len(documents) / max(len(uniques), 1):.1f}x)")
+
+        if self.embedding_store is None:
+            unique_embeddings = self.encode(uniques)
+        else:
+            unique_embeddings = self.embedding_store.get(uniques, self.encode)
+        return unique_embeddings[codes]
+
+    # Encode the (distinct) texts in one call: the model already sorts them by length, so every batch holds
+    # messages of similar length (less padding)
+    def encode(self, texts):
+        if not texts:
+            return np.zeros((0, self.embedding_model.get_sentence_embedding_dimension()), dtype=np.float32)
+        start = time.perf_counter()
+        if self.encode_workers > 1:
+            pool = self.embedding_model.start_multi_process_pool(target_devices=['cpu'] * self.encode_workers)
+            try:
+                embeddings = self.embedding_model.encode_multi_process(texts, pool, batch_size=self.encode_batch_size)
+            finally:
+                self.embedding_model.stop_multi_process_pool(pool)
+        else:
+            embeddings = self.embedding_model.encode(texts, batch_size=self.encode_batch_size)
+
+        elapsed = time.perf_counter() - start
+        print(f"⚡ Encoded {len(texts)} messages in {elapsed:.1f}s ({len(texts) / elapsed:.0f} messages/s)")
+        return embeddings
+
+    # Save the fitted model and the messages with their topics, to rebuild the visualizations without retraining
+    #   <path>/model           BERTopic model (safetensors, with the c-TF-IDF needed by the charts)
+    #   <path>/model.pkl       online models are pickled instead (their vectorizer cannot be rebuilt from safetensors)
+    #   <path>/messages.arrow  date, message and topic of every message
+    #   <path>/topics_over_time.arrow  topic frequencies over time, with the labels of the representation model
+    # The embedding model is not saved: loading the model must not load torch nor look the model up online.
+    def save(self, path):
+        print("💾 Saving the topic model...")
+        os.makedirs(path, exist_ok=True)
+        # One model per directory: the model of the other format, saved by an earlier run, would be loaded instead
+        if self.online_path:
+            shutil.rmtree(os.path.join(path, 'model'), ignore_errors=True)
+            model_path = os.path.join(path, 'model.pkl')
+            representation_model = self.topic_model.representation_model
+            self.topic_model.representation_model = None
+            try:
+                self.topic_model.save(model_path, serialization='pickle', save_embedding_model=False)
+            finally:
+                self.topic_model.representation_model = representation_model
+        else:
+            if os.path.exists(os.path.join(path, 'model.pkl')):
+                os.remove(os.path.join(path, 'model.pkl'))
+            self.topic_model.save(
+                os.path.join(path, 'model'),
+                serialization='safetensors',
+                save_ctfidf=True,
+                save_embedding_model=False
+            )
+        messages = pa.table({
+            'date': pa.array(pd.to_datetime(pd.Series(self.timestamps)), type=pa.timestamp('s')),
+            'message': pa.array(self.documents, type=pa.string()),
+            'topic': pa.array(self.topic_model.topics_, type=pa.int32()),
+        })
+        feather.write_feather(messages, os.path.join(path, 'messages.arrow'), compression='uncompressed')
+        # Not in the safetensors files: the Representative_Docs of topic_info.csv and of the pie chart
+        with open(os.path.join(path, 'representative_docs.json'), 'w', encoding='utf-8') as fp:
+            json.dump({int(topic): docs for topic, docs in (self.topic_model.representative_docs_ or {}).items()}, fp, ensure_ascii=False)
+        # The loaded model has no representation model: the chart would show the raw c-TF-IDF words instead
+        feather.write_feather(
+            pa.Table.from_pandas(self.get_topics_over_time(), preserve_index=False),
+            os.path.join(path, 'topics_over_time.arrow'),
+            compression='uncompressed'
+        )
+
+    # Load a model saved with save(): only the visualizations and get_csv are available
+    # (the embedding model, the clustering and the representation model are not rebuilt)
+    def load(path, outputs_path_TM, *, plotly_js_path=None, image_export=None):
+        print("📂 Loading the saved topic model...")
+        topic_analyzer = TopicModeling.__new__(TopicModeling)
+        topic_analyzer.outputs_path_TM = outputs_path_TM
+        topic_analyzer.plotly_js = PlotlyAsset(plotly_js_path or outputs_path_TM)
+        topic_analyzer.image_export = image_export
+        model_path = os.path.join(path, 'model.pkl')
+        if not os.path.exists(model_path):
+            model_path = os.path.join(path, 'model')
+        topic_analyzer.topic_model = BERTopic.load(model_path)
+
+        messages = feather.read_table(os.path.join(path, 'messages.arrow'), memory_map=True)
+        topic_analyzer.documents = messages['message'].to_pandas()
+        topic_analyzer.timestamps = messages['date'].to_pandas().tolist()
+        topic_analyzer.topic_model.topics_ = messages['topic'].to_numpy().tolist()
+        representative_docs_path = os.path.join(path, 'representative_docs.json')
+        if os.path.exists(representative_docs_path):
+            with open(representative_docs_path, encoding='utf-8') as fp:
+                topic_analyzer.topic_model.representative_docs_ = {int(topic): docs for topic, docs in json.load(fp).items()}
+        # Saved by an older version: recomputed from the c-TF-IDF words (no KeyBERT/OpenAI labels)
+        topics_over_time_path = os.path.join(path, 'topics_over_time.arrow')
+        topic_analyzer.topics_over_time = (
+            feather.read_table(topics_over_time_path).to_pandas() if os.path.exists(topics_over_time_path) else None
+        )
+        return topic_analyzer
+
     # Retrieve the topic information as a DataFrame
     def get_csv(self):
         topic_df = self.topic_model.get_topic_info()
@@ -121,38 +598,43 @@ class TopicModeling:
 
 
     ##### For Visualization: ##### 
+
+    # HTML page of a visualization, and its static image when the run exports them (queued in the batch)
+    def save_figure(self, fig, name):
+        os.makedirs(self.outputs_path_TM, exist_ok=True)
+        output_path = os.path.join(self.outputs_path_TM, name)
+        self.plotly_js.write_html(fig, output_path + ".html")
+        if self.image_export is not None:
+            self.image_export.add(fig, output_path)
     
     # Hierarchical visualization of the topics
     def save_vis_hierarchy(self):
         if self.outputs_path_TM:
-            os.makedirs(self.outputs_path_TM, exist_ok=True)
-            output_path_hierarchy = os.path.join(self.outputs_path_TM, "topic_hierarchy.html")
-            self.topic_model.visualize_hierarchy().write_html(output_path_hierarchy)
+            self.save_figure(self.topic_model.visualize_hierarchy(), "topic_hierarchy")
     
     # Intertopic distance visualization
     def save_vis_map(self):
         if self.outputs_path_TM:
-            os.makedirs(self.outputs_path_TM, exist_ok=True)
-            output_path_map = os.path.join(self.outputs_path_TM, "topic_map.html")
-            self.topic_model.visualize_topics().write_html(output_path_map)
+            self.save_figure(self.topic_model.visualize_topics(), "topic_map")
 
     # Barchart visualization
     def save_vis_barchart(self, ):
         if self.outputs_path_TM:
-            os.makedirs(self.outputs_path_TM, exist_ok=True)
-            output_path_barchart = os.path.join(self.outputs_path_TM, "topic_barchart.html")
-            self.topic_model.visualize_barchart().write_html(output_path_barchart) 
+            self.save_figure(self.topic_model.visualize_barchart(), "topic_barchart")
 
     # topics_over_time visualization (nr_bins=24)
     # nr_bins: Number of time intervals (bins) used to group the timestamps.
     #          This parameter allows you to aggregate the data to reduce the number of unique timestamps,
     #          making it easier to visualize the evolution of topics over time. 
     def save_vis_topics_over_time(self):
-        topics_over_time = self.topic_model.topics_over_time(self.documents, self.timestamps, nr_bins=24)
         if self.outputs_path_TM:
-            os.makedirs(self.outputs_path_TM, exist_ok=True)
-            output_path_barchart = os.path.join(self.outputs_path_TM, "topic_topics_over_time.html")
-            self.topic_model.visualize_topics_over_time(topics_over_time).write_html(output_path_barchart) 
+            self.save_figure(self.topic_model.visualize_topics_over_time(self.get_topics_over_time()), "topic_topics_over_time")
+
+    # Topic frequencies over time, computed once per fit (the representation model labels every bin)
+    def get_topics_over_time(self):
+        if self.topics_over_time is None:
+            self.topics_over_time = self.topic_model.topics_over_time(self.documents, self.timestamps, nr_bins=24)
+        return self.topics_over_time
 
     # Pie visualization 
     def save_vis_pie(
@@ -269,9 +751,7 @@ class TopicModeling:
             legend={'orientation': 'h', 'y': -0.1},
         )
 
-        # Save the figure (HTML)
+        # Save the figure (HTML, and static image when exported)
         if self.outputs_path_TM:
-            os.makedirs(self.outputs_path_TM, exist_ok=True)
-            output_path_pie = os.path.join(self.outputs_path_TM, "topic_pie.html")
-            fig.write_html(output_path_pie)
+            self.save_figure(fig, "topic_pie")
    